@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite for the GGY3601 Geology Toolkit
+Times every geology_toolkit function on synthetic sample files of increasing
+size and reports throughput, peak memory and scaling as JSON.
+
+Example:
+    python scripts/benchmark_toolkit.py --sizes 1000 100000 1000000 --output bench.json
+"""
+
+import csv
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+import geology_toolkit as gt  # noqa: E402
+
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+# Column order of data/sample_data.csv
+SAMPLE_COLUMNS = ['sample_id', 'mass', 'volume', 'grade', 'rock_type', 'depth']
+ROCK_TYPES = ['granite', 'basalt', 'sandstone', 'schist']
+
+
+# ============================================================================
+# SYNTHETIC DATA
+# ============================================================================
+
+def generate_sample_file(path: Path, rows: int, seed: int = 3601) -> None:
+    """Write a synthetic sample file in the data/sample_data.csv schema."""
+    rng = random.Random(seed)
+    block = 10000
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(SAMPLE_COLUMNS)
+        for first in range(1, rows + 1, block):
+            writer.writerows(
+                [f"S{i:08d}",
+                 round(rng.uniform(5.0, 30.0), 2),
+                 round(rng.uniform(1.0, 10.0), 2),
+                 round(rng.uniform(0.1, 8.0), 2),
+                 rng.choice(ROCK_TYPES),
+                 rng.randint(20, 800)]
+                for i in range(first, min(first + block, rows + 1))
+            )
+
+
+class BenchmarkData:
+    """Inputs for one benchmark size; in-memory columns are built on first use."""
+
+    def __init__(self, path: Path, output_path: Path, rows: int, workers: int):
+        self.path = path
+        self.output_path = output_path
+        self.rows = rows
+        self.workers = workers
+        self._columns = None
+        self._lists = None
+
+    @property
+    def columns(self) -> 'gt.SampleColumns':
+        if self._columns is None:
+            self._columns = gt.load_sample_columns(str(self.path))
+        return self._columns
+
+    @property
+    def lists(self) -> Dict[str, List[Any]]:
+        """Plain Python lists for benchmarking the scalar functions."""
+        if self._lists is None:
+            columns = self.columns
+            hardness = list(gt.HARDNESS_MULTIPLIERS)
+            self._lists = {
+                'grade': list(columns.grade),
+                'depth': list(columns.depth),
+                'mass': list(columns.mass),
+                'volume': list(columns.volume),
+                'hardness': [hardness[i % len(hardness)] for i in range(self.rows)],
+                'grain_density': [m / v * 1.2 for m, v in zip(columns.mass, columns.volume)],
+            }
+        return self._lists
+
+
+# ============================================================================
+# BENCHMARKS
+# ============================================================================
+
+def _scalar_density(data: BenchmarkData) -> None:
+    lists = data.lists
+    for mass, volume in zip(lists['mass'], lists['volume']):
+        gt.calculate_density(mass, volume)
+
+
+def _scalar_porosity(data: BenchmarkData) -> None:
+    lists = data.lists
+    for mass, volume, grain in zip(lists['mass'], lists['volume'], lists['grain_density']):
+        gt.calculate_porosity(mass / volume, grain)
+
+
+def _scalar_classify(data: BenchmarkData) -> None:
+    for grade in data.lists['grade']:
+        gt.classify_ore_grade(grade)
+
+
+def _scalar_drilling_cost(data: BenchmarkData) -> None:
+    lists = data.lists
+    for depth, hardness in zip(lists['depth'], lists['hardness']):
+        gt.estimate_drilling_cost(depth, hardness)
+
+
+def _batch_porosity(data: BenchmarkData) -> None:
+    densities = gt.calculate_density_batch(data.columns.mass, data.columns.volume)
+    gt.calculate_porosity_batch(densities, data.lists['grain_density'])
+
+
+def _stream_samples(data: BenchmarkData) -> None:
+    for _ in gt.iter_samples(str(data.path), chunk_size=gt.DEFAULT_CHUNK_SIZE):
+        pass
+
+
+# Benchmark name -> function taking BenchmarkData
+BENCHMARKS: Dict[str, Callable[[BenchmarkData], Any]] = {
+    'load_samples_from_file': lambda d: gt.load_samples_from_file(str(d.path)),
+    'iter_samples': _stream_samples,
+    'load_sample_columns': lambda d: gt.load_sample_columns(str(d.path)),
+    'load_sample_columns_mmap': lambda d: gt.load_sample_columns(str(d.path), engine='mmap'),
+    'read_sample_columns_mmap': lambda d: gt.read_sample_columns_mmap(str(d.path)),
+    'process_samples_and_save': lambda d: gt.process_samples_and_save(
+        str(d.path), str(d.output_path)),
+    'process_samples_and_save_parallel': lambda d: gt.process_samples_and_save(
+        str(d.path), str(d.output_path), workers=d.workers),
+    'calculate_sample_statistics': lambda d: gt.calculate_sample_statistics(
+        d.lists['grade']),
+    'calculate_sample_statistics_columns': lambda d: gt.calculate_sample_statistics(
+        d.columns.grade),
+    'calculate_sample_statistics_percentiles': lambda d: gt.calculate_sample_statistics(
+        d.columns.grade, percentiles=(10, 50, 90)),
+    'aggregate_samples': lambda d: gt.aggregate_samples(str(d.path), by='rock_type'),
+    'aggregate_samples_depth_bins': lambda d: gt.aggregate_samples(
+        str(d.path), by=('rock_type', 'depth'), depth_bin=50),
+    'grade_tonnage_curve': lambda d: gt.grade_tonnage_curve(str(d.path)),
+    'calculate_density': _scalar_density,
+    'calculate_density_batch': lambda d: gt.calculate_density_batch(
+        d.columns.mass, d.columns.volume),
+    'calculate_porosity': _scalar_porosity,
+    'calculate_porosity_batch': _batch_porosity,
+    'classify_ore_grade': _scalar_classify,
+    'classify_ore_grade_batch': lambda d: gt.classify_ore_grade_batch(d.columns.grade),
+    'estimate_drilling_cost': _scalar_drilling_cost,
+    'estimate_drilling_costs': lambda d: gt.estimate_drilling_costs(
+        d.columns.depth, d.lists['hardness']),
+}
+
+
+# ============================================================================
+# MEASUREMENT
+# ============================================================================
+
+def time_call(func: Callable[[], Any], repeat: int) -> List[float]:
+    """Return wall-clock seconds for each of `repeat` calls."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def peak_memory(func: Callable[[], Any]) -> int:
+    """Return the peak bytes allocated by one call, as seen by tracemalloc."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def scaling_exponent(rows: List[int], seconds: List[float]) -> Optional[float]:
+    """Least-squares slope of log(time) against log(rows); 1.0 means linear."""
+    points = [(math.log(n), math.log(t)) for n, t in zip(rows, seconds) if t > 0]
+    if len(points) < 2:
+        return None
+    mean_x = statistics.fmean(x for x, _ in points)
+    mean_y = statistics.fmean(y for _, y in points)
+    sxx = sum((x - mean_x) ** 2 for x, _ in points)
+    if sxx == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / sxx
+
+
+def run_benchmarks(sizes: List[int], names: List[str], repeat: int = 3,
+                   measure_memory: bool = True, workers: Optional[int] = None,
+                   work_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Run the selected benchmarks at every size.
+
+    Returns:
+        Report dictionary with environment metadata, one result per
+        (benchmark, size) and a scaling summary per benchmark
+    """
+    workers = workers or os.cpu_count() or 1
+    results = []
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        for rows in sizes:
+            path = Path(tmp) / f"samples_{rows}.csv"
+            generate_sample_file(path, rows)
+            data = BenchmarkData(path, Path(tmp) / "processed.csv", rows, workers)
+            file_bytes = path.stat().st_size
+
+            for name in names:
+                func = BENCHMARKS[name]
+                call = lambda: func(data)  # noqa: E731
+                call()  # Warm up and build any lazily prepared inputs
+                timings = time_call(call, repeat)
+                best = min(timings)
+                results.append({
+                    'benchmark': name,
+                    'rows': rows,
+                    'file_bytes': file_bytes,
+                    'seconds_best': best,
+                    'seconds_median': statistics.median(timings),
+                    'rows_per_second': rows / best if best > 0 else None,
+                    'peak_memory_bytes': peak_memory(call) if measure_memory else None,
+                })
+                print(f"{name:<40} {rows:>10} rows  {best:10.4f} s",
+                      file=sys.stderr)
+
+    scaling = {}
+    for name in names:
+        points = [r for r in results if r['benchmark'] == name]
+        scaling[name] = {
+            'rows': [r['rows'] for r in points],
+            'seconds': [r['seconds_best'] for r in points],
+            'rows_per_second': [r['rows_per_second'] for r in points],
+            'scaling_exponent': scaling_exponent([r['rows'] for r in points],
+                                                 [r['seconds_best'] for r in points]),
+        }
+
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': gt.np.__version__ if gt.np is not None else None,
+            'workers': workers,
+            'repeat': repeat,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        },
+        'results': results,
+        'scaling': scaling,
+    }
+
+
+# ============================================================================
+# CLI INTERFACE
+# ============================================================================
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the geology toolkit")
+    parser.add_argument("--sizes", type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Row counts to benchmark (e.g. 1000 ... 10000000)")
+    parser.add_argument("--only", nargs='+', choices=list(BENCHMARKS),
+                        help="Run only these benchmarks")
+    parser.add_argument("--skip", nargs='+', choices=list(BENCHMARKS), default=[],
+                        help="Benchmarks to leave out")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Timed runs per benchmark and size")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for the parallel benchmark")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Skip the tracemalloc peak-memory pass")
+    parser.add_argument("--work-dir", type=Path, default=None,
+                        help="Directory for the temporary synthetic files")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="Write the JSON report here instead of stdout")
+
+    args = parser.parse_args()
+
+    selected = [name for name in (args.only or BENCHMARKS) if name not in args.skip]
+    report = run_benchmarks(sorted(args.sizes), selected, repeat=args.repeat,
+                            measure_memory=not args.no_memory, workers=args.workers,
+                            work_dir=args.work_dir)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
@@ -8,10 +8,21 @@ import hashlib
 import random
 import json
 import csv
-from typing import Any, Dict, List, Optional, Callable
+import os
+import pickle
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Dict, List, Optional, Callable, Union
 from dataclasses import dataclass, asdict
 from pathlib import Path
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed for bulk data generation
+    np = None
+
 
 @dataclass
 class VariantConfig:
@@ -84,10 +95,79 @@ class VariantGenerator:
     def generate_batch(
         self,
         student_ids: List[str],
-        param_generators: Dict[str, Callable]
+        param_generators: Union[Dict[str, Callable], Callable[[], Dict[str, Callable]]],
+        workers: int = 1,
+        chunk_size: Optional[int] = None
     ) -> List[StudentVariant]:
-        """Generate variants for multiple students."""
-        return [self.generate_variant(sid, param_generators) for sid in student_ids]
+        """
+        Generate variants for multiple students.
+
+        With workers > 1 the IDs are split into chunks and generated in a
+        process pool. Every variant depends only on its student ID, so the
+        result is identical to the serial one and in the same order.
+
+        Args:
+            student_ids: Student IDs or GitHub usernames
+            param_generators: Dict of parameter generators, or a factory
+                returning one (e.g. create_ca01_generators). The generators
+                returned by the create_*_generators factories are closures
+                that cannot be sent to worker processes, so pass the factory
+                itself when workers > 1.
+            workers: Number of worker processes (default: 1, no pool)
+            chunk_size: IDs per task sent to a worker (default: about four
+                chunks per worker)
+
+        Returns:
+            List of StudentVariant in the order of student_ids
+        """
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1, got {workers}")
+        if workers == 1 or len(student_ids) < 2:
+            generators = _resolve_generators(param_generators)
+            return [self.generate_variant(sid, generators) for sid in student_ids]
+
+        try:
+            pickle.dumps(param_generators)
+        except Exception:
+            raise ValueError(
+                "param_generators cannot be sent to worker processes; pass the "
+                "generator factory (e.g. create_ca01_generators) instead of its result"
+            ) from None
+
+        if chunk_size is None:
+            chunk_size = max(1, -(-len(student_ids) // (workers * 4)))
+        chunks = [student_ids[i:i + chunk_size]
+                  for i in range(0, len(student_ids), chunk_size)]
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                                 initializer=_init_batch_worker,
+                                 initargs=(self.config, param_generators)) as pool:
+            return [variant for chunk in pool.map(_generate_chunk, chunks)
+                    for variant in chunk]
+
+
+# Per-process state for parallel generate_batch workers
+_batch_worker: Dict[str, Any] = {}
+
+
+def _resolve_generators(
+    param_generators: Union[Dict[str, Callable], Callable[[], Dict[str, Callable]]]
+) -> Dict[str, Callable]:
+    """Return the generator dict, calling param_generators if it is a factory."""
+    return param_generators() if callable(param_generators) else param_generators
+
+
+def _init_batch_worker(config: VariantConfig, param_generators) -> None:
+    """Build the generator once per worker process."""
+    _batch_worker['generator'] = VariantGenerator(config)
+    _batch_worker['params'] = _resolve_generators(param_generators)
+
+
+def _generate_chunk(student_ids: List[str]) -> List[StudentVariant]:
+    """Generate the variants for one chunk of student IDs in a worker."""
+    generator = _batch_worker['generator']
+    params = _batch_worker['params']
+    return [generator.generate_variant(sid, params) for sid in student_ids]
 
 
 # ============================================================================
@@ -377,21 +457,64 @@ def create_miniproject_generators() -> Dict[str, Callable]:
 # DATA GENERATION
 # ============================================================================
 
-def generate_sample_data(variant: StudentVariant, output_path: Path, assignment_type: str):
-    """Generate student-specific CSV data files based on variant parameters."""
+SAMPLE_COLUMNS = ['sample_id', 'rock_type', 'grade', 'depth', 'mass', 'volume', 'location']
+SAMPLE_ROCK_TYPES = ['Granite', 'Basalt', 'Sandstone', 'Schist', 'Gneiss']
+
+ASSAY_COLUMNS = ['sample_id', 'hole_id', 'from_depth', 'to_depth', 'lithology',
+                 'Au_ppm', 'Cu_pct', 'Ag_ppm', 'Fe_pct', 'S_pct', 'sample_quality', 'assay_date']
+ASSAY_LITHOLOGIES = ['Granite', 'Basalt', 'Schist', 'Quartzite', 'Gneiss']
+ASSAY_QUALITIES = ['Good', 'Fair', 'Rejected']
+
+# Rows generated and written per block in bulk mode
+BULK_BLOCK_SIZE = 100000
+
+
+def generate_sample_data(variant: StudentVariant, output_path: Path, assignment_type: str,
+                         num_records: Optional[int] = None, bulk: bool = False,
+                         block_size: int = BULK_BLOCK_SIZE, workers: int = 1):
+    """
+    Generate student-specific CSV data files based on variant parameters.
+
+    Args:
+        variant: Student variant providing the seed and parameters
+        output_path: Directory to write the CSV file into
+        assignment_type: Assignment ID; selects samples.csv or geochemical_assays.csv
+        num_records: Number of rows to write instead of the variant's
+            num_records / num_assays parameter
+        bulk: Generate rows in vectorized blocks with NumPy and write each
+            block with a single write. Much faster for millions of rows.
+            Every block draws from its own random stream, derived from
+            variant_seed and the block index, so the file is byte-identical
+            for the same seed and block_size no matter how many workers
+            generate it. The streams differ from the default row-by-row
+            mode, so the two modes produce different (equally valid) data.
+        block_size: Rows per block in bulk mode
+        workers: Processes generating blocks in parallel (bulk mode only)
+
+    Raises:
+        ValueError: If workers > 1 without bulk mode
+    """
+    if bulk:
+        _generate_sample_data_bulk(variant, output_path, assignment_type,
+                                   num_records, block_size, workers)
+        return
+    if workers > 1:
+        raise ValueError("Parallel data generation requires bulk=True")
+
     rng = random.Random(variant.variant_seed)
 
     if assignment_type in ['lab04', 'lab05', 'ca01']:
         # Generate samples.csv style data
-        num_records = variant.parameters.get('num_records', 50)
+        if num_records is None:
+            num_records = variant.parameters.get('num_records', 50)
         locations = variant.parameters.get('locations', ['Site-A', 'Site-B'])
         depth_range = variant.parameters.get('depth_range', {'min': 50, 'max': 500})
 
-        rock_types = ['Granite', 'Basalt', 'Sandstone', 'Schist', 'Gneiss']
+        rock_types = SAMPLE_ROCK_TYPES
 
         with open(output_path / 'samples.csv', 'w', newline='') as f:
             writer = csv.writer(f)
-            writer.writerow(['sample_id', 'rock_type', 'grade', 'depth', 'mass', 'location'])
+            writer.writerow(SAMPLE_COLUMNS)
 
             for i in range(1, num_records + 1):
                 sample_id = f"GEO-{i:03d}"
@@ -399,21 +522,23 @@ def generate_sample_data(variant: StudentVariant, output_path: Path, assignment_
                 grade = round(rng.uniform(0.3, 5.0), 2)
                 depth = rng.randint(depth_range['min'], depth_range['max'])
                 mass = round(rng.uniform(8.0, 20.0), 1)
+                volume = round(rng.uniform(3.0, 8.0), 1)
                 location = rng.choice(locations)
 
-                writer.writerow([sample_id, rock, grade, depth, mass, location])
+                writer.writerow([sample_id, rock, grade, depth, mass, volume, location])
 
     elif assignment_type == 'ca02':
         # Generate geochemical assay data
-        num_assays = variant.parameters.get('num_assays', 500)
+        num_assays = num_records
+        if num_assays is None:
+            num_assays = variant.parameters.get('num_assays', 500)
 
-        lithologies = ['Granite', 'Basalt', 'Schist', 'Quartzite', 'Gneiss']
-        qualities = ['Good', 'Fair', 'Rejected']
+        lithologies = ASSAY_LITHOLOGIES
+        qualities = ASSAY_QUALITIES
 
         with open(output_path / 'geochemical_assays.csv', 'w', newline='') as f:
             writer = csv.writer(f)
-            writer.writerow(['sample_id', 'hole_id', 'from_depth', 'to_depth', 'lithology',
-                           'Au_ppm', 'Cu_pct', 'Ag_ppm', 'Fe_pct', 'S_pct', 'sample_quality', 'assay_date'])
+            writer.writerow(ASSAY_COLUMNS)
 
             for i in range(1, num_assays + 1):
                 sample_id = f"ASY-{i:04d}"
@@ -435,6 +560,164 @@ def generate_sample_data(variant: StudentVariant, output_path: Path, assignment_
                                au, cu, ag, fe, s, quality, date])
 
 
+# ============================================================================
+# BULK DATA GENERATION
+# ============================================================================
+
+def block_rng(variant_seed: int, block_index: int):
+    """
+    Random generator for one block of bulk data.
+
+    Equivalent to SeedSequence(variant_seed).spawn(n)[block_index]: each block
+    gets an independent, reproducible stream that does not depend on any
+    other block, so blocks can be generated in any order or process.
+    """
+    return np.random.default_rng(np.random.SeedSequence(variant_seed,
+                                                        spawn_key=(block_index,)))
+
+
+def _generate_sample_data_bulk(variant: StudentVariant, output_path: Path,
+                               assignment_type: str, num_records: Optional[int],
+                               block_size: int, workers: int):
+    """Write a data file in vectorized blocks (see generate_sample_data)."""
+    if np is None:
+        raise ImportError("Bulk data generation requires NumPy")
+    if block_size < 1:
+        raise ValueError(f"block_size must be at least 1, got {block_size}")
+
+    params = variant.parameters
+    if assignment_type in ['lab04', 'lab05', 'ca01']:
+        filename, columns = 'samples.csv', SAMPLE_COLUMNS
+        total = num_records if num_records is not None else params.get('num_records', 50)
+        locations = params.get('locations', ['Site-A', 'Site-B'])
+        depth_range = params.get('depth_range', {'min': 50, 'max': 500})
+        make_block = partial(_bulk_samples_block, locations=locations,
+                             depth_range=depth_range)
+    elif assignment_type == 'ca02':
+        filename, columns = 'geochemical_assays.csv', ASSAY_COLUMNS
+        total = num_records if num_records is not None else params.get('num_assays', 500)
+        make_block = _bulk_assays_block
+    else:
+        return
+
+    blocks = [(index, first, min(block_size, total + 1 - first))
+              for index, first in enumerate(range(1, total + 1, block_size))]
+
+    with open(output_path / filename, 'w', newline='', buffering=1024 * 1024) as f:
+        csv.writer(f).writerow(columns)
+        if workers <= 1 or len(blocks) <= 1:
+            for index, first, count in blocks:
+                f.write(_bulk_block(make_block, variant.variant_seed, index, first, count))
+            return
+
+        # Keep a bounded number of blocks in flight and write them in order
+        with ProcessPoolExecutor(max_workers=min(workers, len(blocks))) as pool:
+            pending = deque()
+            for index, first, count in blocks:
+                if len(pending) >= 2 * workers:
+                    f.write(pending.popleft().result())
+                pending.append(pool.submit(_bulk_block, make_block,
+                                           variant.variant_seed, index, first, count))
+            while pending:
+                f.write(pending.popleft().result())
+
+
+def _bulk_block(make_block: Callable, variant_seed: int, block_index: int,
+                first: int, count: int) -> str:
+    """Generate one block of bulk data from its own random stream."""
+    return make_block(block_rng(variant_seed, block_index), first, count)
+
+
+def _bulk_samples_block(rng, first: int, count: int, locations: List[str],
+                        depth_range: Dict[str, int]) -> str:
+    """CSV text for `count` samples.csv rows starting at row number `first`."""
+    return _csv_lines(
+        list(map('GEO-{:03d}'.format, range(first, first + count))),
+        _bulk_choice(rng, SAMPLE_ROCK_TYPES, count),
+        _bulk_uniform(rng, 0.3, 5.0, 2, count),
+        _bulk_randint(rng, depth_range['min'], depth_range['max'], count),
+        _bulk_uniform(rng, 8.0, 20.0, 1, count),
+        _bulk_uniform(rng, 3.0, 8.0, 1, count),
+        _bulk_choice(rng, locations, count),
+    )
+
+
+def _bulk_assays_block(rng, first: int, count: int) -> str:
+    """CSV text for `count` geochemical_assays.csv rows starting at row `first`."""
+    from_depth = rng.integers(10, 451, count)
+    to_depth = from_depth + rng.integers(1, 5, count)
+    months = rng.integers(1, 13, count)
+    days = rng.integers(1, 29, count)
+    return _csv_lines(
+        list(map('ASY-{:04d}'.format, range(first, first + count))),
+        _bulk_choice(rng, ['DH-01', 'DH-02', 'DH-03', 'DH-04', 'DH-05'], count),
+        _int_strings(0, 460)[from_depth].tolist(),
+        _int_strings(0, 460)[to_depth].tolist(),
+        _bulk_choice(rng, ASSAY_LITHOLOGIES, count),
+        _bulk_uniform(rng, 0.01, 6.0, 3, count, missing=0.05),
+        _bulk_uniform(rng, 0.1, 3.0, 3, count, missing=0.05),
+        _bulk_uniform(rng, 1.0, 15.0, 2, count, missing=0.05),
+        _bulk_uniform(rng, 3.0, 12.0, 2, count),
+        _bulk_uniform(rng, 0.2, 4.5, 2, count),
+        _bulk_choice(rng, ASSAY_QUALITIES, count),
+        _date_strings()[(months - 1) * 28 + (days - 1)].tolist(),
+    )
+
+
+def _bulk_choice(rng, options: List[str], count: int) -> List[str]:
+    """Pick `count` options uniformly at random."""
+    return np.array(options, dtype=object)[rng.integers(0, len(options), count)].tolist()
+
+
+def _bulk_randint(rng, low: int, high: int, count: int) -> List[str]:
+    """Uniform integers in [low, high] as strings."""
+    return _int_strings(low, high)[rng.integers(0, high - low + 1, count)].tolist()
+
+
+def _bulk_uniform(rng, low: float, high: float, decimals: int, count: int,
+                  missing: float = 0.0) -> List[str]:
+    """
+    Uniform values rounded to `decimals` places, formatted like str(round(x, d)).
+
+    Values are drawn as integers in units of 10**-decimals and looked up in a
+    table of preformatted strings, so no per-value float formatting is done.
+    A `missing` fraction of the values is replaced with ''.
+    """
+    scale = 10 ** decimals
+    low_units = round(low * scale)
+    units = np.rint(rng.uniform(low, high, count) * scale).astype(np.int64)
+    values = _decimal_strings(low_units, round(high * scale), decimals)[units - low_units]
+    if missing:
+        values[rng.random(count) < missing] = ''
+    return values.tolist()
+
+
+@lru_cache(maxsize=None)
+def _decimal_strings(low_units: int, high_units: int, decimals: int):
+    """Table of str(round(k / 10**decimals, decimals)) for k in [low_units, high_units]."""
+    scale = 10 ** decimals
+    return np.array([str(round(k / scale, decimals))
+                     for k in range(low_units, high_units + 1)], dtype=object)
+
+
+@lru_cache(maxsize=None)
+def _int_strings(low: int, high: int):
+    """Table of str(k) for k in [low, high]."""
+    return np.array([str(k) for k in range(low, high + 1)], dtype=object)
+
+
+@lru_cache(maxsize=None)
+def _date_strings():
+    """Table of '2024-MM-DD' for every month and days 1-28, month-major."""
+    return np.array([f"2024-{month:02d}-{day:02d}"
+                     for month in range(1, 13) for day in range(1, 29)], dtype=object)
+
+
+def _csv_lines(*columns: List[str]) -> str:
+    """Join string columns into CSV lines ending in \\r\\n, as csv.writer does."""
+    return ''.join(map('{}\r\n'.format, map(','.join, zip(*columns))))
+
+
 def generate_variant_config_file(variant: StudentVariant) -> str:
     """Generate a JSON config file for tests to read."""
     return json.dumps(asdict(variant), indent=2)
@@ -486,25 +769,39 @@ ASSIGNMENT_GENERATORS = {
 # CLI INTERFACE
 # ============================================================================
 
-if __name__ == "__main__":
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the command-line interface and return the exit status."""
     import argparse
 
     parser = argparse.ArgumentParser(description="Generate GGY3601 assignment variants")
     parser.add_argument("--assignment", required=True,
                         choices=list(ASSIGNMENT_GENERATORS.keys()),
                         help="Assignment ID")
-    parser.add_argument("--student", required=True,
-                        help="Student ID or GitHub username")
+    students = parser.add_mutually_exclusive_group(required=True)
+    students.add_argument("--student",
+                          help="Student ID or GitHub username")
+    students.add_argument("--students-file", type=Path,
+                          help="File with one student ID per line (batch mode)")
     parser.add_argument("--strategy", default="grouped",
                         choices=['unique', 'grouped', 'hybrid'])
     parser.add_argument("--groups", type=int, default=10,
                         help="Number of variant groups")
     parser.add_argument("--output", default="json",
-                        choices=['json', 'config'])
+                        choices=['json', 'config'],
+                        help="json: the variant (a JSON array in batch mode); "
+                             "config: the .variant_config.json contents (one "
+                             "compact line per student in batch mode)")
     parser.add_argument("--output-dir", type=Path, default=None,
                         help="Directory to write generated data files")
+    parser.add_argument("--num-records", type=int, default=None,
+                        help="Rows of sample data to generate (overrides the variant)")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Generate data in vectorized blocks (requires NumPy)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for --students-file batches and "
+                             "--bulk data generation (0 = one per CPU)")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     config = VariantConfig(
         assignment_id=args.assignment,
@@ -513,17 +810,55 @@ if __name__ == "__main__":
     )
 
     generator = VariantGenerator(config)
-    param_generators = ASSIGNMENT_GENERATORS[args.assignment]()
-    variant = generator.generate_variant(args.student, param_generators)
-
-    if args.output == 'json':
-        print(json.dumps(asdict(variant), indent=2))
-    elif args.output == 'config':
-        print(generate_variant_config_file(variant))
-
-    if args.output_dir:
-        args.output_dir.mkdir(parents=True, exist_ok=True)
-        generate_sample_data(variant, args.output_dir, args.assignment)
-        with open(args.output_dir / '.variant_config.json', 'w') as f:
-            f.write(generate_variant_config_file(variant))
-        print(f"Data files generated in: {args.output_dir}")
+    workers = args.workers or os.cpu_count() or 1
+    data_workers = workers if args.bulk else 1
+
+    try:
+        if args.students_file:
+            student_ids = [line.strip()
+                           for line in args.students_file.read_text().splitlines()
+                           if line.strip()]
+            variants = generator.generate_batch(student_ids,
+                                                ASSIGNMENT_GENERATORS[args.assignment],
+                                                workers=workers)
+            if args.output == 'json':
+                print(json.dumps([asdict(v) for v in variants], indent=2))
+            elif args.output == 'config':
+                for v in variants:
+                    print(json.dumps(json.loads(generate_variant_config_file(v))))
+
+            if args.output_dir:
+                for v in variants:
+                    student_dir = args.output_dir / v.student_id
+                    student_dir.mkdir(parents=True, exist_ok=True)
+                    generate_sample_data(v, student_dir, args.assignment,
+                                         num_records=args.num_records, bulk=args.bulk,
+                                         workers=data_workers)
+                    with open(student_dir / '.variant_config.json', 'w') as f:
+                        f.write(generate_variant_config_file(v))
+        else:
+            param_generators = ASSIGNMENT_GENERATORS[args.assignment]()
+            variant = generator.generate_variant(args.student, param_generators)
+
+            if args.output == 'json':
+                print(json.dumps(asdict(variant), indent=2))
+            elif args.output == 'config':
+                print(generate_variant_config_file(variant))
+
+            if args.output_dir:
+                args.output_dir.mkdir(parents=True, exist_ok=True)
+                generate_sample_data(variant, args.output_dir, args.assignment,
+                                     num_records=args.num_records, bulk=args.bulk,
+                                     workers=data_workers)
+                with open(args.output_dir / '.variant_config.json', 'w') as f:
+                    f.write(generate_variant_config_file(variant))
+                print(f"Data files generated in: {args.output_dir}")
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head); stop quietly
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,18 @@ GGY3601 Coding Assignment 1: Geology Toolkit Demonstration
 This program demonstrates the functionality of the geology_toolkit module.
 It showcases each function with sample data and prints the results.
 
+It is also a command-line tool for shell pipelines and scheduled jobs.
+Subcommands read CSV from a file or stdin ('-') and stream results to
+stdout as CSV or JSON Lines:
+
+    python src/main.py                       # Demonstration (same as 'demo')
+    python src/main.py demo --input my_samples.csv --output /tmp/results.csv
+    python src/main.py density samples.csv   # Add a density column
+    python src/main.py classify --commodity copper < samples.csv
+    python src/main.py cost --format json holes.csv
+    python src/main.py stats --by rock_type --percentiles 10,50,90 samples.csv
+    python src/main.py process samples.csv results.csv --workers 4
+
 Update this file to use YOUR assigned values from ASSIGNMENT.md.
 
 Author: [YOUR NAME]
@@ -28,6 +40,11 @@ from geology_toolkit import (
     process_samples_and_save
 )
 
+# Demonstration files, relative to the project root
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEMO_INPUT_FILE = os.path.join(PROJECT_DIR, "data", "sample_data.csv")
+DEMO_OUTPUT_FILE = os.path.join(PROJECT_DIR, "output", "processed_results.csv")
+
 
 def print_header(title: str) -> None:
     """Print a formatted section header."""
@@ -170,16 +187,11 @@ def demonstrate_statistics() -> None:
         print(f"Error: {e}")
 
 
-def demonstrate_file_operations() -> None:
-    """Demonstrate file I/O operations."""
+def demonstrate_file_operations(input_file: str = DEMO_INPUT_FILE,
+                                output_file: str = DEMO_OUTPUT_FILE) -> None:
+    """Demonstrate file I/O operations on a sample file."""
     print_subheader("File Operations")
 
-    # Paths relative to project root
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_dir = os.path.dirname(script_dir)
-    input_file = os.path.join(project_dir, "data", "sample_data.csv")
-    output_file = os.path.join(project_dir, "output", "processed_results.csv")
-
     print(f"Loading samples from: {input_file}")
 
     try:
@@ -200,7 +212,8 @@ def demonstrate_file_operations() -> None:
 
     except FileNotFoundError:
         print(f"File not found: {input_file}")
-        print("Make sure the sample_data.csv file exists in the data/ directory.")
+        print("Make sure the sample data file exists, or pass another one with "
+              "'demo --input'.")
     except ValueError as e:
         print(f"Error reading file: {e}")
 
@@ -208,7 +221,7 @@ def demonstrate_file_operations() -> None:
     print("\nProcessing samples and saving results...")
     try:
         # Create output directory if it doesn't exist
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
 
         count = process_samples_and_save(input_file, output_file)
         print(f"Successfully processed {count} samples")
@@ -217,8 +230,9 @@ def demonstrate_file_operations() -> None:
         print(f"Error processing samples: {e}")
 
 
-def main() -> None:
-    """Main function demonstrating all toolkit capabilities."""
+def run_demo(input_file: str = DEMO_INPUT_FILE,
+             output_file: str = DEMO_OUTPUT_FILE) -> None:
+    """Demonstrate all toolkit capabilities, reading and writing the given files."""
     print_header("GGY3601 GEOLOGY CALCULATION TOOLKIT DEMONSTRATION")
 
     # TODO: Update these with YOUR assigned values from ASSIGNMENT.md
@@ -233,7 +247,7 @@ def main() -> None:
     demonstrate_ore_classification()
     demonstrate_drilling_cost()
     demonstrate_statistics()
-    demonstrate_file_operations()
+    demonstrate_file_operations(input_file, output_file)
 
     print_header("DEMONSTRATION COMPLETE")
     print("\nAll functions have been demonstrated.")
@@ -244,5 +258,242 @@ def main() -> None:
     print("3. Update this demo with your assigned values")
 
 
+# =============================================================================
+# COMMAND-LINE INTERFACE
+# =============================================================================
+
+class RowError(ValueError):
+    """A row that could not be processed in --strict mode."""
+
+
+def open_input(path: str):
+    """Open a CSV input file, or stdin for '-'."""
+    if path == '-':
+        return sys.stdin
+    return open(path, newline='')
+
+
+def read_rows(path: str):
+    """Yield (line number, row dict) from a CSV file or stdin."""
+    import csv
+
+    f = open_input(path)
+    try:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+class RowWriter:
+    """Write row dictionaries to stdout as CSV or JSON Lines."""
+
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self.writer = None
+
+    def write(self, row: dict) -> None:
+        if self.fmt == 'json':
+            import json
+            sys.stdout.write(json.dumps(row) + "\n")
+            return
+        if self.writer is None:
+            import csv
+            self.writer = csv.DictWriter(sys.stdout, fieldnames=list(row),
+                                         lineterminator="\n")
+            self.writer.writeheader()
+        self.writer.writerow(row)
+
+
+def map_rows(args, column: str, compute) -> int:
+    """
+    Add ``column`` = compute(row) to every input row and stream it out.
+
+    Rows that cannot be computed get an empty value (null in JSON) and are
+    counted on stderr, or stop the command in --strict mode.
+    """
+    out = RowWriter(args.format)
+    failed = 0
+    for line, row in read_rows(args.input):
+        try:
+            row[column] = compute(row)
+        except (KeyError, TypeError, ValueError) as e:
+            if args.strict:
+                raise RowError(f"{args.input}, line {line}: {e}") from None
+            row[column] = None if args.format == 'json' else ''
+            failed += 1
+        out.write(row)
+    if failed:
+        print(f"{failed} row(s) could not be processed", file=sys.stderr)
+    return 0
+
+
+def command_density(args) -> int:
+    """Add a density column computed from the mass and volume columns."""
+    return map_rows(args, 'density', lambda row: calculate_density(
+        float(row[args.mass_column]), float(row[args.volume_column])))
+
+
+def command_classify(args) -> int:
+    """Add a classification column computed from the grade column."""
+    return map_rows(args, 'classification', lambda row: classify_ore_grade(
+        float(row[args.column]), args.commodity))
+
+
+def command_cost(args) -> int:
+    """Add a cost column computed from depth, hardness and diameter."""
+    def cost(row):
+        diameter = row.get(args.diameter_column) or args.diameter
+        return estimate_drilling_cost(float(row[args.depth_column]),
+                                      row[args.hardness_column], float(diameter))
+    return map_rows(args, 'cost', cost)
+
+
+def command_stats(args) -> int:
+    """Print summary statistics of a column, overall or per group."""
+    from geology_toolkit import SampleStatistics
+
+    percentiles = args.percentiles or None
+    groups = {}
+    skipped = 0
+    for line, row in read_rows(args.input):
+        try:
+            value = float(row[args.column])
+        except (KeyError, TypeError, ValueError) as e:
+            if args.strict:
+                raise RowError(f"{args.input}, line {line}: {e}") from None
+            skipped += 1
+            continue
+        key = row.get(args.by) if args.by else None
+        stats = groups.get(key)
+        if stats is None:
+            stats = groups[key] = SampleStatistics(quantiles=bool(percentiles))
+        stats.add(value)
+    if skipped:
+        print(f"{skipped} row(s) without a numeric {args.column} were skipped",
+              file=sys.stderr)
+    if not groups:
+        raise RowError(f"{args.input}: no {args.column} values to summarise")
+
+    out = RowWriter(args.format)
+    for key in sorted(groups, key=str):
+        row = {args.by: key} if args.by else {}
+        row.update(groups[key].to_dict(percentiles))
+        out.write(row)
+    return 0
+
+
+def command_process(args) -> int:
+    """Run process_samples_and_save and print a JSON summary."""
+    import json
+    from geology_toolkit import PipelineProfile
+
+    profile = PipelineProfile() if args.profile else None
+    count = process_samples_and_save(args.input, args.output, args.commodity,
+                                     workers=args.workers or os.cpu_count() or 1,
+                                     resume=args.resume, profile=profile)
+    summary = {'input': args.input, 'output': args.output, 'processed': count}
+    if profile is not None:
+        summary['profile'] = profile.report()
+    print(json.dumps(summary, indent=2 if args.profile else None))
+    return 0
+
+
+def parse_percentiles(text: str):
+    """Parse a comma-separated percentile list such as '10,50,90'."""
+    import argparse
+
+    try:
+        return [float(p) for p in text.split(',') if p.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid percentile list: {text!r}") from None
+
+
+def build_parser():
+    """Create the argument parser with one subcommand per tool."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="GGY3601 geology toolkit. Without a command, runs the demonstration.")
+    commands = parser.add_subparsers(dest='command', metavar='command')
+
+    sub = commands.add_parser('demo', help="Run the demonstration (default)")
+    sub.add_argument('--input', default=DEMO_INPUT_FILE,
+                     help="Sample CSV file to load (default: data/sample_data.csv)")
+    sub.add_argument('--output', default=DEMO_OUTPUT_FILE,
+                     help="Results file to write (default: output/processed_results.csv)")
+
+    def streaming(name, help_text, func):
+        sub = commands.add_parser(name, help=help_text, description=help_text)
+        sub.add_argument('input', nargs='?', default='-',
+                         help="CSV file with a header row ('-' or omitted: stdin)")
+        sub.add_argument('--format', choices=['csv', 'json'], default='csv',
+                         help="Output format: CSV or JSON Lines (default: csv)")
+        sub.add_argument('--strict', action='store_true',
+                         help="Stop with an error at the first invalid row")
+        sub.set_defaults(func=func)
+        return sub
+
+    sub = streaming('density', "Add a density column (mass / volume)", command_density)
+    sub.add_argument('--mass-column', default='mass')
+    sub.add_argument('--volume-column', default='volume')
+
+    sub = streaming('classify', "Add an ore grade classification column",
+                    command_classify)
+    sub.add_argument('--column', default='grade', help="Grade column (default: grade)")
+    sub.add_argument('--commodity', default='gold')
+
+    sub = streaming('cost', "Add an estimated drilling cost column", command_cost)
+    sub.add_argument('--depth-column', default='depth')
+    sub.add_argument('--hardness-column', default='rock_hardness')
+    sub.add_argument('--diameter-column', default='diameter',
+                     help="Per-row diameter column, used when present")
+    sub.add_argument('--diameter', type=float, default=0.076,
+                     help="Diameter for rows without one (default: 0.076 m)")
+
+    sub = streaming('stats', "Summary statistics of a numeric column", command_stats)
+    sub.add_argument('--column', default='grade', help="Column to summarise")
+    sub.add_argument('--by', help="Column to group by")
+    sub.add_argument('--percentiles', type=parse_percentiles,
+                     help="Comma-separated percentiles to add, e.g. 10,50,90")
+
+    sub = commands.add_parser('process', help="Process a sample file into a results file")
+    sub.add_argument('input', help="Input sample CSV file")
+    sub.add_argument('output', help="Output CSV file")
+    sub.add_argument('--commodity', default='gold')
+    sub.add_argument('--workers', type=int, default=1,
+                     help="Worker processes (0 = one per CPU)")
+    sub.add_argument('--resume', action='store_true',
+                     help="Keep a checkpoint and only process new rows")
+    sub.add_argument('--profile', action='store_true',
+                     help="Include per-stage timings in the summary")
+    sub.set_defaults(func=command_process)
+    return parser
+
+
+def main(argv=None) -> int:
+    """Run a subcommand, or the demonstration when none is given."""
+    argv = sys.argv[1:] if argv is None else argv
+    args = build_parser().parse_args(argv) if argv else None
+    try:
+        if args is None or args.command is None:
+            run_demo()
+            return 0
+        if args.command == 'demo':
+            run_demo(args.input, args.output)
+            return 0
+        return args.func(args)
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head); stop quietly
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 0
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
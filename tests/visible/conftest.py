@@ -67,3 +67,27 @@ def sample_data_path():
 def temp_output_path(tmp_path):
     """Return path for temporary output file."""
     return tmp_path / "test_output.csv"
+
+
+SAMPLE_HEADER = ("sample_id", "rock_type", "grade", "depth", "mass", "volume")
+
+
+@pytest.fixture
+def sample_file(tmp_path):
+    """
+    Return a function that writes a CSV file under tmp_path.
+
+    sample_file(rows, name="samples.csv", header=SAMPLE_HEADER, append=False,
+    newline="\n") writes one line per row (a string, or a sequence of
+    values joined with commas) after the header, and returns the path.
+    With append=True the rows are added to an existing file without a header.
+    """
+    def write(rows, name="samples.csv", header=SAMPLE_HEADER, append=False, newline="\n"):
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lines = [] if append else [",".join(header)]
+        lines += [row if isinstance(row, str) else ",".join(map(str, row)) for row in rows]
+        with open(path, "a" if append else "w", newline="") as f:
+            f.write("".join(line + newline for line in lines))
+        return path
+    return write
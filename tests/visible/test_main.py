@@ -0,0 +1,191 @@
+"""
+Command-Line Tests
+==================
+
+These tests verify the subcommands of src/main.py, run in-process through
+main() with captured output.
+"""
+
+import csv
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path for imports
+SRC_DIR = Path(__file__).parent.parent.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+import main
+from geology_toolkit import (
+    calculate_density,
+    classify_ore_grade,
+    estimate_drilling_cost,
+    process_samples_and_save
+)
+
+
+SAMPLES = ["A1,granite,1.5,100,10.0,4.0",
+           "A2,basalt,6.0,200,12.0,0",
+           "A3,granite,0.2,300,8.0,2.0"]
+
+
+def read_csv(text):
+    """Parse CSV output into a list of row dictionaries."""
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+# =============================================================================
+# DEMONSTRATION TESTS
+# =============================================================================
+
+class TestDemo:
+    """Tests for the demo command."""
+
+    def test_uses_given_paths(self, sample_data_path, tmp_path, capsys):
+        """Should load --input and write the results to --output."""
+        output = tmp_path / "results" / "processed.csv"
+        assert main.main(['demo', '--input', str(sample_data_path),
+                          '--output', str(output)]) == 0
+        text = capsys.readouterr().out
+        assert "Successfully loaded 50 samples" in text
+        assert f"Results saved to: {output}" in text
+        assert output.exists()
+
+    def test_missing_input_is_reported(self, tmp_path, capsys):
+        """Should report a missing input file and finish the demonstration."""
+        missing = tmp_path / "missing.csv"
+        assert main.main(['demo', '--input', str(missing),
+                          '--output', str(tmp_path / "out.csv")]) == 0
+        text = capsys.readouterr().out
+        assert f"File not found: {missing}" in text
+        assert "DEMONSTRATION COMPLETE" in text
+
+    def test_default_paths(self):
+        """Should default to the project's data and output directories."""
+        args = main.build_parser().parse_args(['demo'])
+        assert Path(args.input) == SRC_DIR.parent / "data" / "sample_data.csv"
+        assert Path(args.output) == SRC_DIR.parent / "output" / "processed_results.csv"
+
+
+# =============================================================================
+# STREAMING COMMAND TESTS
+# =============================================================================
+
+class TestStreamingCommands:
+    """Tests for the density, classify, cost and stats commands."""
+
+    def test_density_csv(self, sample_file, capsys):
+        """Should add a density column and leave failed rows empty."""
+        path = sample_file(SAMPLES)
+        assert main.main(['density', str(path)]) == 0
+        captured = capsys.readouterr()
+        rows = read_csv(captured.out)
+        assert list(rows[0]) == ['sample_id', 'rock_type', 'grade', 'depth', 'mass',
+                                 'volume', 'density']
+        assert [row['density'] for row in rows] == [str(calculate_density(10.0, 4.0)), '',
+                                                    str(calculate_density(8.0, 2.0))]
+        assert "1 row(s) could not be processed" in captured.err
+
+    def test_density_json_from_stdin(self, monkeypatch, capsys):
+        """Should read stdin for '-' and write one JSON object per line."""
+        text = "sample_id,rock_type,grade,depth,mass,volume\n" + "\n".join(SAMPLES) + "\n"
+        monkeypatch.setattr(sys, 'stdin', io.StringIO(text))
+        assert main.main(['density', '-', '--format', 'json']) == 0
+        rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [row['sample_id'] for row in rows] == ['A1', 'A2', 'A3']
+        assert rows[0]['density'] == calculate_density(10.0, 4.0)
+        assert rows[1]['density'] is None
+
+    def test_strict_exit_status(self, sample_file, capsys):
+        """Should stop with exit status 1 at the first invalid row."""
+        path = sample_file(SAMPLES)
+        assert main.main(['density', '--strict', str(path)]) == 1
+        captured = capsys.readouterr()
+        assert captured.err.startswith(f"error: {path}, line 3:")
+        assert len(read_csv(captured.out)) == 1
+
+    def test_classify(self, sample_file, capsys):
+        """Should classify the grade column for the given commodity."""
+        path = sample_file(SAMPLES)
+        assert main.main(['classify', '--commodity', 'copper', str(path)]) == 0
+        rows = read_csv(capsys.readouterr().out)
+        assert [row['classification'] for row in rows] == [
+            classify_ore_grade(float(row['grade']), 'copper') for row in rows]
+
+    def test_cost_default_diameter(self, sample_file, capsys):
+        """Should use the diameter column when set and --diameter otherwise."""
+        path = sample_file(["DH1,100,soft,0.1", "DH2,250,hard,"], "holes.csv",
+                           header=("hole_id", "depth", "rock_hardness", "diameter"))
+        assert main.main(['cost', '--diameter', '0.063', '--format', 'json', str(path)]) == 0
+        rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert rows[0]['cost'] == pytest.approx(estimate_drilling_cost(100, 'soft', 0.1))
+        assert rows[1]['cost'] == pytest.approx(estimate_drilling_cost(250, 'hard', 0.063))
+
+    def test_stats_by_group(self, sample_file, capsys):
+        """Should print one row of statistics per group, sorted by key."""
+        path = sample_file(SAMPLES + ["A4,basalt,n/a,400,9.0,3.0", "A5,granite,0.9,500,9.0,3.0"])
+        assert main.main(['stats', '--by', 'rock_type', '--percentiles', '50',
+                          str(path)]) == 0
+        captured = capsys.readouterr()
+        rows = read_csv(captured.out)
+        assert [row['rock_type'] for row in rows] == ['basalt', 'granite']
+        assert float(rows[1]['mean']) == pytest.approx(2.6 / 3)
+        assert float(rows[1]['p50']) == pytest.approx(0.9)
+        assert "1 row(s) without a numeric grade were skipped" in captured.err
+
+    def test_stats_without_values_fails(self, sample_file, capsys):
+        """Should exit with status 1 when no value can be summarised."""
+        path = sample_file(SAMPLES)
+        assert main.main(['stats', '--column', 'no_such_column', str(path)]) == 1
+        assert "no no_such_column values" in capsys.readouterr().err
+
+
+# =============================================================================
+# OUTPUT TESTS
+# =============================================================================
+
+class TestOutput:
+    """Tests for RowWriter, the process command and broken pipes."""
+
+    def test_row_writer_csv(self, capsys):
+        """Should write the header once, from the first row's keys."""
+        writer = main.RowWriter('csv')
+        writer.write({'a': 1, 'b': 'x,y'})
+        writer.write({'a': 2, 'b': ''})
+        assert capsys.readouterr().out == 'a,b\n1,"x,y"\n2,\n'
+
+    def test_process_summary(self, sample_data_path, tmp_path, capsys):
+        """Should print a JSON summary matching process_samples_and_save."""
+        output = tmp_path / "results.csv"
+        assert main.main(['process', str(sample_data_path), str(output)]) == 0
+        summary = json.loads(capsys.readouterr().out)
+        expected = process_samples_and_save(str(sample_data_path), str(tmp_path / "full.csv"))
+        assert summary == {'input': str(sample_data_path), 'output': str(output),
+                           'processed': expected}
+        assert output.read_bytes() == (tmp_path / "full.csv").read_bytes()
+
+    def test_missing_input_fails(self, tmp_path, capsys):
+        """Should exit with status 1 and an error message for a missing file."""
+        assert main.main(['density', str(tmp_path / "missing.csv")]) == 1
+        assert capsys.readouterr().err.startswith("error:")
+
+    def test_broken_pipe_exits_quietly(self, sample_file, tmp_path, monkeypatch):
+        """Should stop with status 0 when stdout is closed by the reader."""
+        path = sample_file(SAMPLES)
+
+        class ClosedPipe:
+            def __init__(self, f):
+                self.f = f
+
+            def write(self, text):
+                raise BrokenPipeError
+
+            def fileno(self):
+                return self.f.fileno()
+
+        with open(tmp_path / "stdout", 'w') as f:
+            monkeypatch.setattr(sys, 'stdout', ClosedPipe(f))
+            assert main.main(['density', str(path)]) == 0
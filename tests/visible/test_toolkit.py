@@ -6,6 +6,13 @@ These tests verify basic functionality of the geology_toolkit module.
 Hidden tests will cover additional edge cases and integration scenarios.
 """
 
+import bisect
+import csv
+import itertools
+import json
+import os
+import random
+import subprocess
 import sys
 import math
 from pathlib import Path
@@ -16,14 +23,44 @@ import pytest
 SRC_DIR = Path(__file__).parent.parent.parent / "src"
 sys.path.insert(0, str(SRC_DIR))
 
+import geology_toolkit
 from geology_toolkit import (
     calculate_density,
     calculate_porosity,
+    calculate_density_batch,
+    calculate_porosity_batch,
     classify_ore_grade,
+    classify_ore_grade_batch,
+    GradeClassifier,
+    GRADE_CATEGORIES,
     estimate_drilling_cost,
+    estimate_drilling_costs,
     calculate_sample_statistics,
+    SampleStatistics,
+    QuantileSketch,
     load_samples_from_file,
-    process_samples_and_save
+    iter_samples,
+    load_sample_columns,
+    read_sample_columns_mmap,
+    read_sample_cache,
+    sample_cache_path,
+    process_samples_and_save,
+    process_sample_files,
+    PipelineProfile,
+    aggregate_samples,
+    SampleGroup,
+    SampleSchema,
+    SampleError,
+    Sample,
+    build_depth_index,
+    load_depth_index,
+    depth_index_path,
+    query_samples_by_depth,
+    iter_composites,
+    composite_assays,
+    GradeTonnageCurve,
+    grade_tonnage_curve,
+    optimize_drilling_program
 )
 
 
@@ -106,6 +143,54 @@ class TestPorosity:
             calculate_porosity(3000, 2650)
 
 
+# =============================================================================
+# BATCH PHYSICAL PROPERTY TESTS
+# =============================================================================
+
+class TestDensityBatch:
+    """Tests for calculate_density_batch function."""
+
+    def test_matches_scalar_function(self):
+        """Should agree with calculate_density row for row."""
+        masses = [15.5, 10.0, 25.0]
+        volumes = [5.0, 4.0, 10.0]
+        result = calculate_density_batch(masses, volumes)
+        for value, mass, volume in zip(result, masses, volumes):
+            assert value == pytest.approx(calculate_density(mass, volume))
+
+    def test_invalid_rows_become_nan(self):
+        """Should mark bad rows with NaN instead of raising."""
+        result = list(calculate_density_batch([10.0, -5.0, 10.0], [4.0, 2.0, 0.0]))
+        assert result[0] == pytest.approx(2.5)
+        assert math.isnan(result[1])
+        assert math.isnan(result[2])
+
+    def test_empty_batch(self):
+        """Should return an empty result for empty input."""
+        assert len(calculate_density_batch([], [])) == 0
+
+    def test_length_mismatch_raises_error(self):
+        """Should raise ValueError when columns differ in length."""
+        with pytest.raises(ValueError):
+            calculate_density_batch([1.0, 2.0], [1.0])
+
+
+class TestPorosityBatch:
+    """Tests for calculate_porosity_batch function."""
+
+    def test_matches_scalar_function(self):
+        """Should agree with calculate_porosity row for row."""
+        result = calculate_porosity_batch([2400, 2650, 1500], [2650, 2650, 2500])
+        assert list(result) == pytest.approx([9.4339622, 0.0, 40.0])
+
+    def test_invalid_rows_become_nan(self):
+        """Should mark bad rows with NaN instead of raising."""
+        result = list(calculate_porosity_batch([-100, 3000, 2400], [2650, 2650, 2650]))
+        assert math.isnan(result[0])
+        assert math.isnan(result[1])
+        assert result[2] == pytest.approx(9.43, rel=0.01)
+
+
 # =============================================================================
 # ORE CLASSIFICATION TESTS
 # =============================================================================
@@ -150,6 +235,60 @@ class TestOreClassification:
         assert classify_ore_grade(3.0) == classify_ore_grade(3.0, 'gold')
 
 
+class TestOreClassificationBatch:
+    """Tests for classify_ore_grade_batch and GradeClassifier."""
+
+    def test_matches_scalar_function(self):
+        """Should agree with classify_ore_grade for every grade."""
+        grades = [0.1, 0.5, 1.9, 2.0, 4.9, 5.0, 10.0]
+        codes, labels = classify_ore_grade_batch(grades, 'gold')
+        assert [labels[c] for c in codes] == [classify_ore_grade(g, 'gold') for g in grades]
+
+    def test_labels_are_grade_categories(self):
+        """Should return labels ordered from lowest to highest category."""
+        _, labels = classify_ore_grade_batch([1.0], 'copper')
+        assert tuple(labels) == GRADE_CATEGORIES
+
+    def test_invalid_grades_get_invalid_code(self):
+        """Should mark negative and NaN grades with code -1."""
+        codes, _ = classify_ore_grade_batch([-1.0, float('nan'), 65.0], 'iron')
+        assert list(codes) == [-1, -1, 3]
+
+    def test_codes_tolist_without_numpy(self, monkeypatch):
+        """Should return plain ints from codes.tolist() with and without NumPy."""
+        expected = [0, 2, -1]
+        codes, _ = classify_ore_grade_batch([0.2, 3.5, -1.0], 'gold')
+        assert codes.tolist() == expected
+        monkeypatch.setattr(geology_toolkit, 'np', None)
+        codes, _ = classify_ore_grade_batch([0.2, 3.5, -1.0], 'gold')
+        assert codes.tolist() == expected
+        assert all(type(code) is int for code in codes.tolist())
+
+    def test_invalid_commodity_raises_error(self):
+        """Should raise ValueError for unknown commodity."""
+        with pytest.raises(ValueError):
+            classify_ore_grade_batch([1.0], 'platinum')
+
+    def test_custom_thresholds(self):
+        """Should compile explicitly supplied thresholds."""
+        classifier = GradeClassifier('test', {'low': 1.0, 'medium': 2.0, 'high': 3.0})
+        assert classifier.classify(2.5) == 'Medium'
+
+    def test_unordered_thresholds_raise_error(self):
+        """Should reject thresholds that are not increasing."""
+        with pytest.raises(ValueError):
+            GradeClassifier('test', {'low': 3.0, 'medium': 2.0, 'high': 1.0})
+
+    def test_scalar_classification_does_not_import_numpy(self):
+        """Should leave NumPy unimported until a batch is classified."""
+        code = ("import sys, geology_toolkit as gt\n"
+                "gt.classify_ore_grade(3.5, 'gold')\n"
+                "assert 'numpy' not in sys.modules\n"
+                "gt.classify_ore_grade_batch([3.5], 'gold')\n"
+                "assert gt.np is None or 'numpy' in sys.modules\n")
+        subprocess.run([sys.executable, '-c', code], cwd=SRC_DIR, check=True)
+
+
 # =============================================================================
 # DRILLING COST TESTS
 # =============================================================================
@@ -198,6 +337,164 @@ class TestDrillingCost:
             estimate_drilling_cost(-100, 'medium')
 
 
+class TestDrillingCampaignCost:
+    """Tests for estimate_drilling_costs function."""
+
+    def test_matches_scalar_function(self):
+        """Should agree with estimate_drilling_cost hole for hole."""
+        depths = [100, 250, 650, 900]
+        hardness = ['soft', 'medium', 'hard', 'very_hard']
+        diameters = [0.076, 0.1, 0.076, 0.152]
+        costs, total = estimate_drilling_costs(depths, hardness, diameters)
+        expected = [estimate_drilling_cost(d, h, dia)
+                    for d, h, dia in zip(depths, hardness, diameters)]
+        assert list(costs) == pytest.approx(expected)
+        assert total == pytest.approx(sum(expected))
+
+    def test_single_hardness_and_diameter(self):
+        """Should broadcast a single hardness and diameter to every hole."""
+        costs, total = estimate_drilling_costs([100, 200], 'medium')
+        assert list(costs) == pytest.approx([11250.0, 22500.0])
+        assert total == pytest.approx(33750.0)
+
+    def test_invalid_holes_excluded_from_total(self):
+        """Should give NaN costs for invalid holes and skip them in the total."""
+        costs, total = estimate_drilling_costs([100, -5, 100], ['soft', 'soft', 'granite'])
+        costs = list(costs)
+        assert costs[0] == pytest.approx(7500.0)
+        assert math.isnan(costs[1])
+        assert math.isnan(costs[2])
+        assert total == pytest.approx(7500.0)
+
+    def test_length_mismatch_raises_error(self):
+        """Should raise ValueError when columns differ in length."""
+        with pytest.raises(ValueError):
+            estimate_drilling_costs([100, 200], ['soft'])
+
+    def test_unknown_single_hardness_raises_error(self):
+        """Should raise ValueError for an unknown hardness given for all holes."""
+        with pytest.raises(ValueError):
+            estimate_drilling_costs([100, 200], 'granite')
+
+    def test_numpy_scalar_diameter(self):
+        """Should treat a NumPy scalar diameter as one diameter for every hole."""
+        np = pytest.importorskip("numpy")
+        costs, total = estimate_drilling_costs([100, 200], 'soft', np.float32(0.152))
+        assert list(costs) == pytest.approx([30000.0, 60000.0])
+        costs, total = estimate_drilling_costs([100, 200], 'soft', np.int64(1))
+        assert total == pytest.approx(estimate_drilling_cost(100, 'soft', 1)
+                                      + estimate_drilling_cost(200, 'soft', 1))
+
+
+class TestDrillingProgram:
+    """Tests for the drilling program optimizer."""
+
+    HOLES = [{'hole_id': 'DH1', 'target_depth': 200, 'rock_hardness': 'soft'},
+             {'hole_id': 'DH2', 'target_depth': 400, 'rock_hardness': 'hard'}]
+
+    def test_best_program_within_budget(self):
+        """Should drill the most meters the budget allows."""
+        program = optimize_drilling_program(self.HOLES, budget=40000)
+        assert [(h['hole_id'], h['depth']) for h in program['holes']] == [
+            ('DH1', 200.0), ('DH2', 100.0)]
+        assert program['total_value'] == program['total_meters'] == 300.0
+        assert program['total_cost'] == pytest.approx(
+            estimate_drilling_cost(200, 'soft') + estimate_drilling_cost(100, 'hard'))
+
+    def test_matches_brute_force(self):
+        """Should find the same best value as trying every combination."""
+        rng = random.Random(11)
+        diameters, fractions = (0.076, 0.152), (0.25, 0.5, 0.75, 1.0)
+        for _ in range(40):
+            holes = [{'hole_id': str(i), 'target_depth': 8 * rng.randint(5, 60),
+                      'rock_hardness': rng.choice(['soft', 'medium', 'hard']),
+                      'grade': rng.choice([0.0, 1.5, 6.0])} for i in range(4)]
+            budget = rng.randint(5000, 100000)
+            program = optimize_drilling_program(holes, budget, 'metal', diameters,
+                                                fractions, budget_steps=budget)
+            options = [[(0.0, 0.0)] + [
+                (estimate_drilling_cost(h['target_depth'] * f, h['rock_hardness'], d),
+                 h['grade'] * h['target_depth'] * f)
+                for d in diameters for f in fractions] for h in holes]
+            best = max(sum(v for _, v in combo) for combo in itertools.product(*options)
+                       if sum(c for c, _ in combo) <= budget)
+            assert program['total_value'] == pytest.approx(best)
+            assert program['total_cost'] <= budget
+
+    def test_pure_python_matches_numpy(self, monkeypatch):
+        """Should choose the same program without NumPy."""
+        rng = random.Random(12)
+        holes = [{'hole_id': str(i), 'target_depth': rng.uniform(50, 800),
+                  'rock_hardness': rng.choice(['soft', 'medium', 'hard', 'very_hard']),
+                  'grade': rng.uniform(0, 5), 'ore_from': rng.uniform(0, 200)}
+                 for i in range(60)]
+        expected = optimize_drilling_program(holes, 1e6, 'metal', (0.063, 0.076),
+                                             budget_steps=2000)
+        monkeypatch.setattr(geology_toolkit, 'np', None)
+        program = optimize_drilling_program(holes, 1e6, 'metal', (0.063, 0.076),
+                                            budget_steps=2000)
+        assert program['total_value'] == pytest.approx(expected['total_value'])
+        assert program['total_cost'] <= 1e6
+
+    def test_rounding_never_exceeds_budget(self, monkeypatch):
+        """Should round a cost just above a whole unit up, not down."""
+        cost = estimate_drilling_cost(200, 'soft')
+        budget = 2 * cost * (1 - 3e-13)  # Each hole costs a hair more than one unit
+        holes = [dict(self.HOLES[0], hole_id=hole_id) for hole_id in ('DH1', 'DH2')]
+        for numpy in (geology_toolkit.np, None):
+            monkeypatch.setattr(geology_toolkit, 'np', numpy)
+            program = optimize_drilling_program(holes, budget, depth_fractions=(1.0,),
+                                                budget_steps=2)
+            assert len(program['holes']) == 1
+            assert program['total_cost'] <= budget
+
+    def test_options_pruned_by_value(self):
+        """Should not drill past the ore or wider than needed when it adds nothing."""
+        holes = [{'hole_id': 'DH1', 'target_depth': 400, 'rock_hardness': 'soft',
+                  'grade': 2.0, 'ore_to': 100},
+                 {'hole_id': 'DH2', 'target_depth': 400, 'rock_hardness': 'soft',
+                  'grade': 2.0, 'min_diameter': 0.09}]
+        program = optimize_drilling_program(holes, 1e7, 'metal', (0.076, 0.096, 0.152))
+        first, second = program['holes']
+        assert (first['depth'], first['diameter'], first['value']) == (100.0, 0.076, 200.0)
+        assert (second['depth'], second['diameter'], second['value']) == (400.0, 0.096, 800.0)
+
+    def test_variant_config_rates(self, tmp_path):
+        """Should take the base rate and depth-bonus threshold from the config file."""
+        config = tmp_path / ".variant_config.json"
+        config.write_text(json.dumps({"parameters": {
+            "base_drilling_rate": 65, "depth_bonus_threshold": 300}}))
+        holes = [{'hole_id': 'DH1', 'target_depth': 400, 'rock_hardness': 'medium'}]
+        program = optimize_drilling_program(holes, 1e6, config=str(config))
+        assert program['total_cost'] == pytest.approx(65 * 400 * 1.5 * 1.25)
+
+    def test_csv_input_and_output(self, tmp_path):
+        """Should read candidate holes from CSV and write the chosen ones."""
+        path = tmp_path / "holes.csv"
+        path.write_text("hole_id,target_depth,rock_hardness,grade\n"
+                        "DH1,200,soft,1.0\n"
+                        "DH2,400,hard,\n")
+        output = tmp_path / "program.csv"
+        program = optimize_drilling_program(str(path), 1e6, output_file=str(output))
+        assert program['candidates'] == 2 and program['total_meters'] == 600.0
+        with open(output, newline='') as f:
+            assert [row['hole_id'] for row in csv.DictReader(f)] == ['DH1', 'DH2']
+
+    def test_invalid_arguments(self):
+        """Should reject unknown objectives, bad budgets and invalid holes."""
+        with pytest.raises(ValueError):
+            optimize_drilling_program(self.HOLES, 1000, objective='profit')
+        with pytest.raises(ValueError):
+            optimize_drilling_program(self.HOLES, 0)
+        with pytest.raises(ValueError):
+            optimize_drilling_program(self.HOLES, 1000, objective='metal')
+        with pytest.raises(ValueError):
+            optimize_drilling_program([{'hole_id': 'X', 'target_depth': 100,
+                                        'rock_hardness': 'granite'}], 1000)
+        with pytest.raises(ValueError):
+            optimize_drilling_program(self.HOLES, 1000, depth_fractions=(0.5, 1.5))
+
+
 # =============================================================================
 # STATISTICS TESTS
 # =============================================================================
@@ -249,6 +546,125 @@ class TestStatistics:
             calculate_sample_statistics([])
 
 
+class TestStatisticsAccumulator:
+    """Tests for the SampleStatistics accumulator."""
+
+    def test_matches_calculate_sample_statistics(self):
+        """Should produce the same dictionary as the function."""
+        grades = [1.2, 2.5, 3.8, 1.9, 4.2, 2.1, 3.5]
+        stats = SampleStatistics()
+        for grade in grades:
+            stats.add(grade)
+        expected = calculate_sample_statistics(grades)
+        for key, value in stats.to_dict().items():
+            assert value == pytest.approx(expected[key])
+
+    def test_merge_equals_single_pass(self):
+        """Merged partial results should equal one pass over all data."""
+        grades = [0.5 * i for i in range(1, 41)]
+        parts = []
+        for chunk in (grades[:7], grades[7:8], grades[8:]):
+            part = SampleStatistics()
+            part.update(chunk)
+            parts.append(part)
+        merged = SampleStatistics()
+        for part in parts:
+            merged.merge(part)
+        expected = calculate_sample_statistics(grades)
+        for key, value in merged.to_dict().items():
+            assert value == pytest.approx(expected[key])
+
+    def test_accepts_iterators(self):
+        """Should consume a stream without needing its length."""
+        stats = SampleStatistics()
+        stats.update(float(x) for x in range(1, 6))
+        assert stats.to_dict()['std'] == pytest.approx(1.581, rel=0.01)
+
+    def test_numerically_stable(self):
+        """Should keep precision with a large offset."""
+        stats = SampleStatistics()
+        stats.update([1e9 + x for x in (4.0, 7.0, 13.0, 16.0)])
+        assert stats.std == pytest.approx(5.4772256, rel=1e-6)
+
+    def test_empty_accumulator_raises_error(self):
+        """Should raise ValueError when no values were added."""
+        with pytest.raises(ValueError):
+            SampleStatistics().to_dict()
+
+
+class TestQuantileSketch:
+    """Tests for QuantileSketch and percentiles in calculate_sample_statistics."""
+
+    @staticmethod
+    def _rank_error(values, fractions, estimates):
+        ordered = sorted(values)
+        return max(abs(bisect.bisect_right(ordered, e) / len(ordered) - q)
+                   for q, e in zip(fractions, estimates))
+
+    def test_small_input_is_exact(self):
+        """Should return exact nearest-rank percentiles for small inputs."""
+        stats = calculate_sample_statistics([5.0, 1.0, 4.0, 2.0, 3.0], (10, 50, 90))
+        assert (stats['p10'], stats['p50'], stats['p90']) == (1.0, 3.0, 5.0)
+
+    def test_percentile_keys_are_optional(self):
+        """Should leave the dictionary unchanged without percentiles."""
+        stats = calculate_sample_statistics([1.0, 2.0, 3.0])
+        assert set(stats) == {'count', 'mean', 'min', 'max', 'std'}
+
+    def test_large_stream_within_error_bound(self):
+        """Should stay within the stated rank error with bounded memory."""
+        rng = random.Random(7)
+        values = [rng.lognormvariate(0, 1) for _ in range(50000)]
+        sketch = QuantileSketch()
+        for value in values:
+            sketch.add(value)
+        fractions = [0.1, 0.5, 0.9]
+        assert self._rank_error(values, fractions, sketch.quantiles(fractions)) \
+            <= sketch.rank_error
+        assert sum(map(len, sketch._levels)) < 3 * sketch.k
+
+    def test_merged_shards_within_error_bound(self):
+        """Merged sketches should summarise all the shards' values."""
+        rng = random.Random(11)
+        values = [rng.uniform(0, 10) for _ in range(30000)]
+        merged = QuantileSketch()
+        for i in range(4):
+            shard = QuantileSketch(seed=i)
+            shard.update(values[i::4])
+            merged.merge(shard)
+        assert merged.count == len(values)
+        assert merged.quantile(0) == min(values)
+        assert merged.quantile(1) == max(values)
+        fractions = [0.05, 0.25, 0.5, 0.75, 0.95]
+        assert self._rank_error(values, fractions, merged.quantiles(fractions)) \
+            <= merged.rank_error
+
+    def test_statistics_merge_keeps_percentiles(self):
+        """Merging SampleStatistics should merge their sketches."""
+        first = SampleStatistics(quantiles=True)
+        first.update([1.0, 2.0, 3.0])
+        second = SampleStatistics(quantiles=True)
+        second.update([4.0, 5.0])
+        first.merge(second)
+        assert first.to_dict((50,))['p50'] == 3.0
+        plain = SampleStatistics()
+        plain.update([6.0])
+        with pytest.raises(ValueError):
+            first.merge(plain)
+
+    def test_invalid_percentile_raises_error(self):
+        """Should raise ValueError for percentiles outside 0-100."""
+        with pytest.raises(ValueError):
+            calculate_sample_statistics([1.0, 2.0], (150,))
+
+    def test_percentiles_need_sketch(self):
+        """Should raise ValueError when no sketch was kept."""
+        stats = SampleStatistics()
+        stats.update([1.0, 2.0])
+        with pytest.raises(ValueError):
+            stats.to_dict((50,))
+
+
 # =============================================================================
 # FILE I/O TESTS
 # =============================================================================
@@ -301,6 +717,939 @@ class TestFileOperations:
         assert temp_output_path.exists()
 
 
+class TestStreamingLoad:
+    """Tests for iter_samples and streaming processing."""
+
+    CSV_TEXT = (
+        "sample_id,rock_type,grade,depth,mass,volume\n"
+        "A1,granite,1.5,100,10.0,4.0\n"
+        "A2,basalt,6.0,200,12.0,3.0\n"
+        "A3,schist,0.2,300,-1.0,2.0\n"
+    )
+
+    def test_matches_load_samples(self, sample_data_path):
+        """Should yield the same records as load_samples_from_file."""
+        if not sample_data_path.exists():
+            pytest.skip("Sample data file not found")
+        streamed = list(iter_samples(str(sample_data_path)))
+        assert streamed == load_samples_from_file(str(sample_data_path))
+
+    def test_chunked_iteration(self, tmp_path):
+        """Should yield fixed-size chunks with a shorter final chunk."""
+        path = tmp_path / "samples.csv"
+        path.write_text(self.CSV_TEXT)
+        chunks = list(iter_samples(str(path), chunk_size=2))
+        assert [len(chunk) for chunk in chunks] == [2, 1]
+        assert chunks[0][1]['grade'] == pytest.approx(6.0)
+
+    def test_missing_file_raises_immediately(self):
+        """Should raise FileNotFoundError before iteration starts."""
+        with pytest.raises(FileNotFoundError):
+            iter_samples('/nonexistent/path/file.csv')
+
+    def test_missing_column_raises_error(self, tmp_path):
+        """Should raise ValueError when a required column is missing."""
+        path = tmp_path / "samples.csv"
+        path.write_text("sample_id,rock_type,grade\nA1,granite,1.5\n")
+        with pytest.raises(ValueError):
+            iter_samples(str(path))
+
+    def test_bad_numeric_value_raises_error(self, tmp_path):
+        """Should raise ValueError naming the offending line."""
+        path = tmp_path / "samples.csv"
+        path.write_text(self.CSV_TEXT + "A4,granite,abc,400,10.0,4.0\n")
+        with pytest.raises(ValueError, match="line 5"):
+            list(iter_samples(str(path)))
+
+    def test_process_adds_columns_and_skips_invalid(self, tmp_path):
+        """Should add density/classification and skip unprocessable rows."""
+        path = tmp_path / "samples.csv"
+        path.write_text(self.CSV_TEXT)
+        output = tmp_path / "out.csv"
+        assert process_samples_and_save(str(path), str(output)) == 2
+        lines = output.read_text().splitlines()
+        assert lines[0].endswith("density,classification")
+        assert lines[2].endswith(",4.0,High")
+
+
+class TestSampleSchema:
+    """Tests for SampleSchema and the error-collection mode of the loaders."""
+
+    HEADER = ['sample_id', 'rock_type', 'grade', 'depth', 'mass', 'volume']
+
+    def test_convert_numeric_columns(self):
+        """Should convert the numeric columns and keep the others as text."""
+        row = SampleSchema(self.HEADER).convert(['A1', 'granite', '1.5', '100', '10', '4'])
+        assert row == {'sample_id': 'A1', 'rock_type': 'granite', 'grade': 1.5,
+                       'depth': 100.0, 'mass': 10.0, 'volume': 4.0}
+
+    def test_custom_converters(self):
+        """Should apply the given converter to each listed column."""
+        schema = SampleSchema(['hole', 'depth'], {'depth': int})
+        assert schema.convert(['H1', '42']) == {'hole': 'H1', 'depth': 42}
+        assert schema.check(['H1', '4.5']) == ('depth', "invalid depth value '4.5'")
+
+    def test_check_reports_column_and_field_count(self):
+        """Should name the bad column, or report a wrong field count."""
+        schema = SampleSchema(self.HEADER)
+        assert schema.check(['A1', 'granite', '1.5', '100', '10', '4']) is None
+        assert schema.check(['A1', 'granite', 'n/a', '100', '10', '4'])[0] == 'grade'
+        assert schema.check(['A1', 'granite']) == (None, "expected 6 fields, got 2")
+
+    def test_unknown_converter_column_raises_error(self):
+        """Should reject a converter for a column not in the header."""
+        with pytest.raises(ValueError):
+            SampleSchema(['sample_id'], {'grade': float})
+
+    def test_load_collects_errors_and_keeps_going(self, tmp_path):
+        """Should skip bad rows and record line, column and reason for each."""
+        path = tmp_path / "samples.csv"
+        path.write_text(TestStreamingLoad.CSV_TEXT
+                        + "A4,granite,n/a,400,10.0,4.0\n"
+                        + "A5,basalt\n"
+                        + "A6,schist,2.5,600,9.0,3.0\n")
+        errors = []
+        samples = load_samples_from_file(str(path), errors=errors)
+        assert [s['sample_id'] for s in samples] == ['A1', 'A2', 'A3', 'A6']
+        assert errors == [
+            SampleError(5, 'grade', "invalid grade value 'n/a'"),
+            SampleError(6, None, "expected 6 fields, got 2"),
+        ]
+        assert errors[0].to_dict() == {'line': 5, 'column': 'grade',
+                                       'reason': "invalid grade value 'n/a'"}
+
+    def test_iter_samples_collects_errors_in_chunks(self, tmp_path):
+        """Should collect errors while streaming chunks."""
+        path = tmp_path / "samples.csv"
+        path.write_text(TestStreamingLoad.CSV_TEXT + "A4,granite,abc,400,10.0,4.0\n")
+        errors = []
+        chunks = list(iter_samples(str(path), chunk_size=2, errors=errors))
+        assert [len(chunk) for chunk in chunks] == [2, 1]
+        assert [e.line for e in errors] == [5]
+
+
+class TestSampleRecord:
+    """Tests for the compact Sample record format."""
+
+    def test_matches_dict_records(self, sample_data_path):
+        """Should hold the same values as the dictionary rows."""
+        dicts = load_samples_from_file(sample_data_path)
+        samples = load_samples_from_file(sample_data_path, record='sample')
+        assert all(isinstance(s, Sample) for s in samples)
+        assert [s.to_dict() for s in samples] == dicts
+
+    def test_dictionary_style_access(self):
+        """Should support the read access main.py uses on dictionary rows."""
+        sample = Sample('GEO-001', 'granite', 2.5, 120.0, 20.0, 8.0)
+        assert sample['grade'] == 2.5
+        assert sample.get('depth') == 120.0
+        assert sample.get('lab', 'N/A') == 'N/A'
+        assert 'mass' in sample and 'lab' not in sample
+        assert list(sample) == ['sample_id', 'rock_type', 'grade', 'depth', 'mass', 'volume']
+        with pytest.raises(KeyError):
+            sample['lab']
+
+    def test_rock_type_interned(self, sample_data_path):
+        """Should share one string object per rock type."""
+        samples = load_samples_from_file(sample_data_path, record='sample')
+        by_name = {}
+        for sample in samples:
+            assert by_name.setdefault(sample.rock_type, sample.rock_type) is sample.rock_type
+
+    def test_extra_columns_kept(self, tmp_path):
+        """Should keep columns beyond the required six in extra."""
+        path = tmp_path / "samples.csv"
+        path.write_text("sample_id,rock_type,grade,depth,mass,volume,lab\n"
+                        "A1,granite,1.5,100,10.0,4.0,ALS\n")
+        sample, = load_samples_from_file(str(path), record='sample')
+        assert sample['lab'] == 'ALS' and sample.extra == {'lab': 'ALS'}
+        assert sample.to_dict()['lab'] == 'ALS'
+
+    def test_collects_errors(self, tmp_path):
+        """Should combine with the error-collection mode."""
+        path = tmp_path / "samples.csv"
+        path.write_text(TestStreamingLoad.CSV_TEXT + "A4,granite,abc,400,10.0,4.0\n")
+        errors = []
+        samples = load_samples_from_file(str(path), errors=errors, record='sample')
+        assert len(samples) == 3 and [e.line for e in errors] == [5]
+
+    def test_unknown_record_raises_error(self, sample_data_path):
+        """Should reject an unknown record format."""
+        with pytest.raises(ValueError):
+            load_samples_from_file(sample_data_path, record='tuple')
+
+
+class TestParallelProcessing:
+    """Tests for process_samples_and_save with worker processes."""
+
+    @staticmethod
+    def _rows(rows=20000, bad_line=None):
+        lines = []
+        for i in range(rows):
+            mass = -1.0 if i % 97 == 0 else 10.0 + i % 13
+            lines.append(f"S{i:06d},granite,{(i % 70) / 10},{i % 800},{mass},{1 + i % 7}")
+        if bad_line is not None:
+            lines[bad_line - 2] = "BAD,granite,not-a-number,1,1,1"  # Line 1 is the header
+        return lines
+
+    def test_output_matches_single_process(self, tmp_path, sample_file):
+        """Should write the same rows in the same order as workers=1."""
+        source = sample_file(self._rows(), "big.csv")
+        serial = tmp_path / "serial.csv"
+        parallel = tmp_path / "parallel.csv"
+        serial_count = process_samples_and_save(str(source), str(serial))
+        parallel_count = process_samples_and_save(str(source), str(parallel), workers=3)
+        assert parallel_count == serial_count
+        assert parallel.read_bytes() == serial.read_bytes()
+
+    def test_error_reports_file_line_number(self, tmp_path, sample_file):
+        """Should report the line number within the whole file."""
+        source = sample_file(self._rows(bad_line=19000), "big.csv")
+        with pytest.raises(ValueError, match="line 19000"):
+            process_samples_and_save(str(source), str(tmp_path / "out.csv"), workers=2)
+
+    def test_small_file_skips_process_pool(self, sample_data_path, tmp_path, monkeypatch):
+        """Should process a file too small to split without starting a pool."""
+        import concurrent.futures
+
+        def no_pool(*args, **kwargs):
+            raise AssertionError("process pool started for a single range")
+
+        monkeypatch.setattr(concurrent.futures, 'ProcessPoolExecutor', no_pool)
+        serial, parallel = tmp_path / "serial.csv", tmp_path / "parallel.csv"
+        process_samples_and_save(str(sample_data_path), str(serial))
+        assert process_samples_and_save(str(sample_data_path), str(parallel),
+                                        workers=4) == 50
+        assert parallel.read_bytes() == serial.read_bytes()
+
+    def test_invalid_worker_count_raises_error(self, sample_data_path, temp_output_path):
+        """Should raise ValueError for fewer than one worker."""
+        with pytest.raises(ValueError):
+            process_samples_and_save(str(sample_data_path), str(temp_output_path), workers=0)
+
+
+class TestIncrementalProcessing:
+    """Tests for process_samples_and_save with resume=True."""
+
+    @staticmethod
+    def _lines(start, stop):
+        return [f"S{i:06d},granite,{(i % 70) / 10},{i % 800},"
+                f"{-1.0 if i % 97 == 0 else 10.0 + i % 13},{1 + i % 7}"
+                for i in range(start, stop)]
+
+    def test_first_run_matches_full_processing(self, tmp_path, sample_file):
+        """Should write the same output as a run without checkpointing."""
+        source = sample_file(self._lines(0, 500), "log.csv")
+        full = tmp_path / "full.csv"
+        out = tmp_path / "out.csv"
+        assert (process_samples_and_save(str(source), str(out), resume=True)
+                == process_samples_and_save(str(source), str(full)))
+        assert out.read_bytes() == full.read_bytes()
+        assert os.path.exists(str(out) + geology_toolkit.CHECKPOINT_SUFFIX)
+
+    def test_processes_only_appended_rows(self, tmp_path, sample_file):
+        """Should process just the new rows and append them to the output."""
+        out = tmp_path / "out.csv"
+        source = sample_file(self._lines(0, 500), "log.csv")
+        first = process_samples_and_save(str(source), str(out), resume=True)
+        sample_file(self._lines(500, 600), "log.csv", append=True)
+        second = process_samples_and_save(str(source), str(out), resume=True)
+
+        full = tmp_path / "full.csv"
+        assert first + second == process_samples_and_save(str(source), str(full))
+        assert second == 99
+        assert out.read_bytes() == full.read_bytes()
+        assert process_samples_and_save(str(source), str(out), resume=True) == 0
+
+    def test_changed_commodity_reprocesses_everything(self, tmp_path, sample_file):
+        """Should only resume with the commodity the checkpoint was made with."""
+        out = tmp_path / "out.csv"
+        source = sample_file(self._lines(0, 300), "log.csv")
+        first = process_samples_and_save(str(source), str(out), 'copper', resume=True)
+        assert process_samples_and_save(str(source), str(out), 'gold', resume=True) == first
+        with open(str(out) + geology_toolkit.CHECKPOINT_SUFFIX) as f:
+            assert json.load(f)['commodity'] == 'gold'
+        assert process_samples_and_save(str(source), str(out), 'gold', resume=True) == 0
+
+        full = tmp_path / "full.csv"
+        process_samples_and_save(str(source), str(full), 'gold')
+        assert out.read_bytes() == full.read_bytes()
+
+    def test_unterminated_last_line_is_redone(self, tmp_path, sample_file):
+        """Should reprocess a last line that was still being written."""
+        out = tmp_path / "out.csv"
+        lines = self._lines(1, 11)
+        source = sample_file(lines[:-1], "log.csv")
+        with open(source, 'a') as f:
+            f.write("S000010,granite,1.5,10,1")
+        process_samples_and_save(str(source), str(out), resume=True)
+        sample_file([",3"] + lines[-1:], "log.csv", append=True)
+        process_samples_and_save(str(source), str(out), resume=True)
+
+        full = tmp_path / "full.csv"
+        process_samples_and_save(str(source), str(full))
+        assert out.read_bytes() == full.read_bytes()
+
+    def test_resumes_after_failure(self, tmp_path, sample_file, monkeypatch):
+        """Should continue from the last checkpoint after an interrupted run."""
+        monkeypatch.setattr(geology_toolkit, 'CHECKPOINT_BLOCK_BYTES', 4096)
+        out = tmp_path / "out.csv"
+        lines = self._lines(0, 2000)
+        source = sample_file(lines[:1500] + ["BAD,granite,x,1,1,1"] + lines[1501:], "log.csv")
+        with pytest.raises(ValueError, match="line 1502"):
+            process_samples_and_save(str(source), str(out), resume=True)
+
+        sample_file(lines, "log.csv")
+        checkpoint = str(out) + geology_toolkit.CHECKPOINT_SUFFIX
+        with open(checkpoint) as f:
+            assert 0 < json.load(f)['offset'] < source.stat().st_size
+        process_samples_and_save(str(source), str(out), resume=True)
+
+        full = tmp_path / "full.csv"
+        process_samples_and_save(str(source), str(full))
+        assert out.read_bytes() == full.read_bytes()
+
+    def test_changed_prefix_reprocesses_everything(self, tmp_path, sample_file):
+        """Should start over when already processed rows were edited."""
+        out = tmp_path / "out.csv"
+        lines = self._lines(0, 300)
+        source = sample_file(lines, "log.csv")
+        process_samples_and_save(str(source), str(out), resume=True)
+        lines[5] = "S000005,basalt,9.9,5,20.0,2"
+        sample_file(lines, "log.csv")
+        assert process_samples_and_save(str(source), str(out), resume=True) == 296
+
+        full = tmp_path / "full.csv"
+        process_samples_and_save(str(source), str(full))
+        assert out.read_bytes() == full.read_bytes()
+
+    def test_parallel_resume(self, tmp_path, sample_file, monkeypatch):
+        """Should process the appended rows with workers and match a serial run."""
+        monkeypatch.setattr(geology_toolkit, 'MIN_PARALLEL_CHUNK_BYTES', 1024)
+        out = tmp_path / "out.csv"
+        source = sample_file(self._lines(0, 1000), "log.csv")
+        process_samples_and_save(str(source), str(out), workers=2, resume=True)
+        sample_file(self._lines(1000, 3000), "log.csv", append=True)
+        process_samples_and_save(str(source), str(out), workers=2, resume=True)
+
+        full = tmp_path / "full.csv"
+        process_samples_and_save(str(source), str(full))
+        assert out.read_bytes() == full.read_bytes()
+
+
+class TestPipelineProfile:
+    """Tests for process_samples_and_save instrumentation."""
+
+    @staticmethod
+    def _rows(rows=300, bad_line=None):
+        lines = []
+        for i in range(rows):
+            mass = -1.0 if i % 10 == 0 else 10.0 + i % 13
+            lines.append(f"S{i:05d},granite,{(i % 70) / 10},{i % 800},{mass},{1 + i % 7}")
+        if bad_line is not None:
+            lines[bad_line - 2] = "BAD,granite,1.0,1,1"  # Line 1 is the header
+        return lines
+
+    def test_records_every_stage(self, tmp_path, sample_file):
+        """Should count rows, rejected rows and bytes per stage."""
+        source, out = sample_file(self._rows(), "in.csv"), tmp_path / "out.csv"
+        profile = PipelineProfile()
+        count = process_samples_and_save(str(source), str(out), profile=profile)
+        report = profile.report()
+        stages = report['stages']
+        assert set(stages) == set(PipelineProfile.STAGES)
+        assert stages['parse']['rows'] == stages['convert']['rows'] == 300
+        assert stages['validate']['errors'] == 30
+        assert stages['write']['rows'] == count == 270
+        assert report['total']['bytes_read'] == source.stat().st_size
+        assert report['total']['bytes_written'] == out.stat().st_size
+        assert all(stage['wall_seconds'] >= 0 for stage in stages.values())
+
+    def test_output_unchanged(self, tmp_path, sample_file):
+        """Should write the same output with and without a profile."""
+        source = sample_file(self._rows(), "in.csv")
+        plain, profiled = tmp_path / "plain.csv", tmp_path / "profiled.csv"
+        process_samples_and_save(str(source), str(plain))
+        process_samples_and_save(str(source), str(profiled), profile=PipelineProfile())
+        assert plain.read_bytes() == profiled.read_bytes()
+
+    def test_callback_receives_reports(self, tmp_path, sample_file):
+        """Should pass the report to the callback."""
+        source = sample_file(self._rows(), "in.csv")
+        reports = []
+        process_samples_and_save(str(source), str(tmp_path / "out.csv"),
+                                 profile=PipelineProfile(callback=reports.append))
+        assert reports and reports[-1]['stages']['write']['rows'] == 270
+
+    def test_conversion_error_is_counted(self, tmp_path, sample_file):
+        """Should count the failing row and still report its line number."""
+        source = sample_file(self._rows(bad_line=120), "in.csv")
+        profile = PipelineProfile()
+        with pytest.raises(ValueError, match="line 120"):
+            process_samples_and_save(str(source), str(tmp_path / "out.csv"),
+                                     profile=profile)
+        assert profile.stages['convert'].errors == 1
+
+    def test_parallel_profiles_are_merged(self, tmp_path, sample_file, monkeypatch):
+        """Should add up the workers' stage counters."""
+        monkeypatch.setattr(geology_toolkit, 'MIN_PARALLEL_CHUNK_BYTES', 1024)
+        source = sample_file(self._rows(rows=3000), "in.csv")
+        profile = PipelineProfile()
+        count = process_samples_and_save(str(source), str(tmp_path / "out.csv"),
+                                         workers=2, profile=profile)
+        assert profile.stages['parse'].rows == 3000
+        assert profile.stages['write'].rows == count
+
+
+class TestBatchFileProcessing:
+    """Tests for process_sample_files."""
+
+    @staticmethod
+    def _write_holes(sample_file, directory, bad=()):
+        for hole in range(4):
+            lines = [f"DH{hole}-{i:03d},granite,{i / 10},{i * 5},{10 + i},{2 + i % 3}"
+                     for i in range(50)]
+            if hole in bad:
+                lines.append("BAD,granite,not-a-number,1,1,1")
+            sample_file(lines, f"{directory}/hole_{hole}.csv")
+
+    def test_processes_every_file_in_directory(self, tmp_path, sample_file):
+        """Should write one output per input, matching single-file processing."""
+        self._write_holes(sample_file, "in")
+        manifest = process_sample_files(str(tmp_path / "in"), str(tmp_path / "out"),
+                                        workers=1)
+        assert manifest['files'] == 4 and manifest['failed'] == 0
+        single = tmp_path / "single.csv"
+        count = process_samples_and_save(str(tmp_path / "in" / "hole_2.csv"), str(single))
+        assert (tmp_path / "out" / "hole_2.csv").read_bytes() == single.read_bytes()
+        assert manifest['samples'] == 4 * count
+
+    def test_bad_file_does_not_stop_batch(self, tmp_path, sample_file):
+        """Should record the failure in the manifest and process the other files."""
+        self._write_holes(sample_file, "in", bad=(1,))
+        manifest = process_sample_files(str(tmp_path / "in" / "*.csv"),
+                                        str(tmp_path / "out"), workers=2)
+        assert manifest['succeeded'] == 3 and manifest['failed'] == 1
+        failed = [r for r in manifest['results'] if r['status'] == 'failed']
+        assert failed[0]['input'].endswith("hole_1.csv")
+        assert "line 52" in failed[0]['error']
+        with open(tmp_path / "out" / "manifest.json") as f:
+            assert json.load(f)['failed'] == 1
+
+    def test_no_files_raises_error(self, tmp_path):
+        """Should raise FileNotFoundError when nothing matches."""
+        with pytest.raises(FileNotFoundError):
+            process_sample_files(str(tmp_path / "*.csv"), str(tmp_path / "out"))
+
+    def test_output_over_input_raises_error(self, tmp_path, sample_file):
+        """Should refuse to write outputs over their inputs."""
+        self._write_holes(sample_file, "in")
+        with pytest.raises(ValueError):
+            process_sample_files(str(tmp_path / "in"), str(tmp_path / "in"))
+
+
+class TestGroupAggregation:
+    """Tests for aggregate_samples and SampleGroup."""
+
+    def test_matches_per_group_statistics(self, sample_data_path):
+        """Each group should match calculate_sample_statistics on its rows."""
+        if not sample_data_path.exists():
+            pytest.skip("Sample data file not found")
+        rows = load_samples_from_file(str(sample_data_path))
+        groups = aggregate_samples(str(sample_data_path), by='rock_type')
+        assert set(groups) == {row['rock_type'] for row in rows}
+        for rock_type, group in groups.items():
+            grades = [row['grade'] for row in rows if row['rock_type'] == rock_type]
+            expected = calculate_sample_statistics(grades)
+            table_row = group.to_dict()
+            assert table_row['count'] == len(grades)
+            for key in ('mean', 'min', 'max', 'std'):
+                assert table_row[f"grade_{key}"] == pytest.approx(expected[key])
+            labels = [classify_ore_grade(grade) for grade in grades]
+            for label in GRADE_CATEGORIES:
+                assert table_row[label] == labels.count(label)
+
+    def test_depth_bins_and_multiple_columns(self, tmp_path):
+        """Should group on several columns with binned depths."""
+        source = tmp_path / "samples.csv"
+        source.write_text(
+            "sample_id,rock_type,grade,depth,mass,volume\n"
+            "S1,granite,1.0,50,10,2\n"
+            "S2,granite,3.0,99,10,0\n"
+            "S3,granite,2.0,150,10,5\n"
+            "S4,basalt,6.0,20,12,4\n"
+        )
+        groups = aggregate_samples(str(source), by=('rock_type', 'depth'), depth_bin=100)
+        assert sorted(groups) == [('basalt', 0), ('granite', 0), ('granite', 100)]
+        shallow = groups[('granite', 0)].to_dict()
+        assert shallow['count'] == 2
+        assert shallow['grade_mean'] == pytest.approx(2.0)
+        assert shallow['density_mean'] == pytest.approx(5.0)  # Zero volume skipped
+        assert (shallow['Low'], shallow['Medium']) == (1, 1)
+
+    def test_writes_table(self, tmp_path, sample_data_path):
+        """Should write one CSV row per group, sorted by key."""
+        if not sample_data_path.exists():
+            pytest.skip("Sample data file not found")
+        table = tmp_path / "groups.csv"
+        groups = aggregate_samples(str(sample_data_path), percentiles=(50,),
+                                   output_file=str(table))
+        with open(table) as f:
+            rows = list(csv.DictReader(f))
+        assert [row['rock_type'] for row in rows] == sorted(groups)
+        assert 'grade_p50' in rows[0] and 'High' in rows[0]
+
+    def test_groups_merge(self, sample_data_path):
+        """Merged groups should equal a group over all the rows."""
+        if not sample_data_path.exists():
+            pytest.skip("Sample data file not found")
+        groups = aggregate_samples(str(sample_data_path))
+        total = SampleGroup()
+        for group in groups.values():
+            total.merge(group)
+        grades = [row['grade'] for row in load_samples_from_file(str(sample_data_path))]
+        assert total.count == len(grades)
+        assert total.to_dict()['grade_mean'] == pytest.approx(sum(grades) / len(grades))
+
+    def test_missing_column_raises_error(self, sample_data_path):
+        """Should raise ValueError when grouping by an unknown column."""
+        if not sample_data_path.exists():
+            pytest.skip("Sample data file not found")
+        with pytest.raises(ValueError):
+            aggregate_samples(str(sample_data_path), by='no_such_column')
+
+
+class TestGradeTonnage:
+    """Tests for grade-tonnage curves."""
+
+    def test_query_above_cutoff(self):
+        """Should sum tonnage and metal of the grades at or above the cut-off."""
+        curve = GradeTonnageCurve([0.4, 2.5, 6.0, 2.0], [10.0, 20.0, 5.0, 4.0])
+        row = curve.query(2.0)
+        assert row['count'] == 3
+        assert row['tonnage'] == pytest.approx(29.0)
+        assert row['metal'] == pytest.approx(2.5 * 20 + 6.0 * 5 + 2.0 * 4)
+        assert row['mean_grade'] == pytest.approx(row['metal'] / 29.0)
+        assert row['classification'] == 'Medium'
+        assert curve.query(7.0)['mean_grade'] is None
+        assert curve.total_tonnage == pytest.approx(39.0)
+
+    def test_matches_brute_force(self):
+        """Should agree with filtering the samples for every cut-off."""
+        rng = random.Random(5)
+        grades = [round(rng.uniform(0, 8), 2) for _ in range(2000)]
+        tonnages = [rng.uniform(0.5, 3.0) for _ in grades]
+        curve = GradeTonnageCurve(grades, tonnages)
+        for cutoff in (0.0, 0.5, 1.37, 2.0, 5.0, 7.99, 9.0):
+            above = [(g, t) for g, t in zip(grades, tonnages) if g >= cutoff]
+            row = curve.query(cutoff)
+            assert row['count'] == len(above)
+            assert row['tonnage'] == pytest.approx(sum(t for _, t in above))
+            assert row['metal'] == pytest.approx(sum(g * t for g, t in above))
+
+    def test_invalid_samples_left_out(self):
+        """Should skip negative or NaN grades and non-positive tonnages."""
+        curve = GradeTonnageCurve([1.0, -1.0, math.nan, 3.0, 4.0],
+                                  [1.0, 1.0, 1.0, 0.0, math.nan])
+        assert len(curve) == 1 and curve.total_tonnage == 1.0
+
+    def test_default_cutoffs_from_thresholds(self, sample_data_path):
+        """Should report the commodity thresholds with their classification."""
+        table = grade_tonnage_curve(str(sample_data_path), commodity='copper')
+        assert [row['cutoff'] for row in table] == [0.3, 1.0, 2.0]
+        assert [row['classification'] for row in table] == ['Low', 'Medium', 'High']
+        counts = [row['count'] for row in table]
+        assert counts == sorted(counts, reverse=True)
+
+    def test_tonnage_from_density(self, tmp_path, sample_file):
+        """Should use density x volume (or block volume) in tonnes."""
+        path = sample_file(["A1,granite,1.0,100,2700,1.0",
+                            "A2,granite,3.0,200,5400,1.0",
+                            "A3,granite,6.0,300,-1.0,1.0"])
+        own, = grade_tonnage_curve(str(path), cutoffs=[0])
+        assert own['count'] == 2 and own['tonnage'] == pytest.approx(8.1)
+        block, = grade_tonnage_curve(str(path), cutoffs=[2.0], block_volume=10.0,
+                                     engine='csv', output_file=str(tmp_path / "gt.csv"))
+        assert block['tonnage'] == pytest.approx(54.0)
+        assert block['metal'] == pytest.approx(162.0)
+        assert (tmp_path / "gt.csv").read_text().startswith("cutoff,classification,count")
+
+    def test_invalid_arguments(self, sample_data_path):
+        """Should reject mismatched columns, bad block volumes and engines."""
+        with pytest.raises(ValueError):
+            GradeTonnageCurve([1.0, 2.0], [1.0])
+        with pytest.raises(ValueError):
+            grade_tonnage_curve(str(sample_data_path), block_volume=0)
+        with pytest.raises(ValueError):
+            grade_tonnage_curve(str(sample_data_path), engine='pandas')
+
+
+class TestColumnarLoad:
+    """Tests for load_sample_columns and SampleColumns."""
+
+    def test_matches_row_loader(self, sample_data_path):
+        """Should hold the same data as load_samples_from_file."""
+        if not sample_data_path.exists():
+            pytest.skip("Sample data file not found")
+        rows = load_samples_from_file(str(sample_data_path))
+        columns = load_sample_columns(str(sample_data_path))
+        assert len(columns) == len(rows)
+        for i in (0, len(rows) - 1):
+            expected = {key: rows[i][key] for key in columns.record(i)}
+            assert columns.record(i) == expected
+
+    def test_rock_types_are_encoded(self, sample_data_path):
+        """Should store rock types once and decode them back."""
+        if not sample_data_path.exists():
+            pytest.skip("Sample data file not found")
+        rows = load_samples_from_file(str(sample_data_path))
+        columns = load_sample_columns(str(sample_data_path))
+        assert len(columns.rock_types) == len({row['rock_type'] for row in rows})
+        assert columns.rock_type() == [row['rock_type'] for row in rows]
+
+    def test_columns_feed_batch_functions(self, sample_data_path):
+        """Columns should be accepted directly by the batch functions."""
+        if not sample_data_path.exists():
+            pytest.skip("Sample data file not found")
+        columns = load_sample_columns(str(sample_data_path))
+        densities = list(calculate_density_batch(columns.mass, columns.volume))
+        assert densities[0] == pytest.approx(columns.mass[0] / columns.volume[0])
+        codes, labels = classify_ore_grade_batch(columns.grade)
+        assert labels[codes[0]] == classify_ore_grade(columns.grade[0])
+
+    def test_header_only_file(self, tmp_path):
+        """Should return empty columns for a file with no data rows."""
+        path = tmp_path / "samples.csv"
+        path.write_text("sample_id,rock_type,grade,depth,mass,volume\n")
+        assert len(load_sample_columns(str(path))) == 0
+
+
+class TestMmapReader:
+    """Tests for read_sample_columns_mmap and the mmap loading engine."""
+
+    CSV_TEXT = (
+        "sample_id,rock_type,grade,depth,mass,volume\r\n"
+        "A1,granite,1.5,100,10.0,4.0\r\n"
+        "\r\n"
+        "A2,basalt,6.0,200,12.0,3.0\r\n"
+        "A3,schist,0.2,300,8.0,2.0"
+    )
+
+    def test_matches_csv_engine(self, sample_data_path):
+        """Should load exactly the same columns as the csv engine."""
+        if not sample_data_path.exists():
+            pytest.skip("Sample data file not found")
+        expected = load_sample_columns(str(sample_data_path))
+        columns = load_sample_columns(str(sample_data_path), engine='mmap')
+        assert columns.sample_id == expected.sample_id
+        assert columns.rock_type() == expected.rock_type()
+        assert list(columns.grade) == list(expected.grade)
+        assert list(columns.volume) == list(expected.volume)
+
+    def test_reads_only_requested_columns(self, tmp_path):
+        """Should return just the requested columns, typed by column."""
+        path = tmp_path / "samples.csv"
+        path.write_bytes(self.CSV_TEXT.encode())
+        data = read_sample_columns_mmap(str(path), ['grade', 'rock_type'])
+        assert set(data) == {'grade', 'rock_type'}
+        assert list(data['grade']) == [1.5, 6.0, 0.2]
+        assert data['rock_type'] == ['granite', 'basalt', 'schist']
+
+    def test_small_blocks(self, tmp_path, monkeypatch):
+        """Should give the same result when the file spans many blocks."""
+        monkeypatch.setattr(geology_toolkit, 'MMAP_BLOCK_BYTES', 16)
+        path = tmp_path / "samples.csv"
+        path.write_bytes(self.CSV_TEXT.encode())
+        data = read_sample_columns_mmap(str(path), ['sample_id', 'depth'])
+        assert data['sample_id'] == ['A1', 'A2', 'A3']
+        assert list(data['depth']) == [100.0, 200.0, 300.0]
+
+    def test_bad_value_reports_line(self, tmp_path, monkeypatch):
+        """Should report the file line number of a bad value."""
+        monkeypatch.setattr(geology_toolkit, 'MMAP_BLOCK_BYTES', 40)
+        path = tmp_path / "samples.csv"
+        path.write_bytes((self.CSV_TEXT + "\r\nA4,granite,x,1,1,1\r\n").encode())
+        with pytest.raises(ValueError, match="line 6"):
+            read_sample_columns_mmap(str(path), ['grade'])
+
+    def test_wrong_field_count_raises_error(self, tmp_path):
+        """Should reject rows with the wrong number of fields."""
+        path = tmp_path / "samples.csv"
+        path.write_bytes((self.CSV_TEXT + "\nA4,granite,1.0\n").encode())
+        with pytest.raises(ValueError, match="line 6"):
+            read_sample_columns_mmap(str(path), ['grade'])
+
+    def test_unrequested_columns_not_decoded(self, tmp_path, monkeypatch):
+        """Should skip malformed values in columns that were not requested."""
+        path = tmp_path / "samples.csv"
+        path.write_bytes(b"sample_id,rock_type,grade,depth,mass,volume\r\n"
+                         b"A1,\xff\xfe,1.5,100,n/a,4.0\r\n"
+                         b"A2,basalt,6.0,200,12.0,bad\r\n")
+        for numpy in (geology_toolkit.np, None):
+            monkeypatch.setattr(geology_toolkit, 'np', numpy)
+            data = read_sample_columns_mmap(str(path), ['grade', 'depth'])
+            assert list(data['grade']) == [1.5, 6.0]
+            assert list(data['depth']) == [100.0, 200.0]
+            with pytest.raises(ValueError, match="line 2: invalid mass value 'n/a'"):
+                read_sample_columns_mmap(str(path), ['mass'])
+
+    def test_same_result_without_numpy(self, tmp_path, monkeypatch):
+        """Should find the same fields with and without the vectorized scan."""
+        rng = random.Random(9)
+        lines = ["sample_id,rock_type,grade,depth,mass,volume"]
+        for i in range(500):
+            lines.append(f"S{i},{rng.choice(['granite', 'basalt'])},{rng.uniform(0, 8):.3f},"
+                         f"{rng.randint(1, 900)},{rng.uniform(1, 30):.2f},{rng.uniform(1, 9)}")
+            if i % 97 == 0:
+                lines.append("")
+        path = tmp_path / "samples.csv"
+        path.write_bytes("\r\n".join(lines).encode())
+        monkeypatch.setattr(geology_toolkit, 'MMAP_BLOCK_BYTES', 4096)
+        columns = ['volume', 'sample_id', 'grade']
+        expected = read_sample_columns_mmap(str(path), columns)
+        monkeypatch.setattr(geology_toolkit, 'np', None)
+        data = read_sample_columns_mmap(str(path), columns)
+        assert data['sample_id'] == expected['sample_id']
+        assert len(data['sample_id']) == 500
+        assert list(data['volume']) == list(expected['volume'])
+        assert list(data['grade']) == list(expected['grade'])
+
+    def test_quoted_file_raises_error(self, tmp_path):
+        """Should refuse files with quoted fields."""
+        path = tmp_path / "samples.csv"
+        path.write_text('sample_id,rock_type,grade,depth,mass,volume\n"A1",g,1,1,1,1\n')
+        with pytest.raises(ValueError):
+            read_sample_columns_mmap(str(path))
+
+    def test_missing_column_raises_error(self, tmp_path):
+        """Should raise ValueError for a requested column that is absent."""
+        path = tmp_path / "samples.csv"
+        path.write_bytes(self.CSV_TEXT.encode())
+        with pytest.raises(ValueError):
+            read_sample_columns_mmap(str(path), ['location'])
+
+
+class TestSampleCache:
+    """Tests for the binary sample cache."""
+
+    @staticmethod
+    def _rows(rows=3, grade=1.5):
+        return [f"S{i:05d},granite,{grade},{100 + i},10.0,4.0" for i in range(rows)]
+
+    def test_cache_round_trip(self, sample_file):
+        """Should return the same columns from the cache as from the CSV."""
+        path = sample_file(self._rows())
+        parsed = load_sample_columns(str(path), cache=True)
+        assert Path(sample_cache_path(str(path))).exists()
+        cached = read_sample_cache(str(path))
+        assert cached is not None
+        assert cached.sample_id == parsed.sample_id
+        assert cached.rock_type() == parsed.rock_type()
+        assert list(cached.depth) == list(parsed.depth)
+
+    def test_changed_file_invalidates_cache(self, sample_file):
+        """Should reparse when the CSV file changes."""
+        path = sample_file(self._rows(grade=1.5))
+        load_sample_columns(str(path), cache=True)
+        sample_file(self._rows(rows=4, grade=2.5))
+        assert read_sample_cache(str(path)) is None
+        columns = load_sample_columns(str(path), cache=True)
+        assert list(columns.grade) == [2.5] * 4
+
+    def test_verify_hash_detects_same_size_edit(self, sample_file):
+        """Should catch an edit that keeps size and mtime when verifying."""
+        path = sample_file(self._rows(rows=8000))
+        load_sample_columns(str(path), cache=True)
+        stat = path.stat()
+        text = path.read_text()
+        middle = text.index("S04000,granite,1.5")
+        path.write_text(text[:middle] + "S04000,granite,9.5" + text[middle + 18:])
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert read_sample_cache(str(path)) is not None
+        assert read_sample_cache(str(path), verify_hash=True) is None
+
+    def test_load_verifies_hash_by_default(self, sample_file):
+        """Should reparse after a same-length mid-file edit unless opted out."""
+        path = sample_file(self._rows(rows=8000))
+        load_sample_columns(str(path), cache=True)
+        stat = path.stat()
+        text = path.read_text()
+        middle = text.index("S04000,granite,1.5")
+        path.write_text(text[:middle] + "S04000,granite,9.5" + text[middle + 18:])
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        stale = load_sample_columns(str(path), cache=True, verify_hash=False)
+        assert stale.grade[4000] == 1.5
+        columns = load_sample_columns(str(path), cache=True)
+        assert columns.grade[4000] == 9.5
+
+    def test_cache_dir(self, tmp_path, sample_file):
+        """Should place the cache in cache_dir when given."""
+        path = sample_file(self._rows())
+        cache_dir = tmp_path / "cache"
+        cache_dir.mkdir()
+        load_sample_columns(str(path), cache=True, cache_dir=str(cache_dir))
+        assert len(list(cache_dir.iterdir())) == 1
+        assert not Path(sample_cache_path(str(path))).exists()
+
+    def test_corrupt_cache_is_ignored(self, sample_file):
+        """Should fall back to parsing when the cache is unreadable."""
+        path = sample_file(self._rows())
+        Path(sample_cache_path(str(path))).write_bytes(b"not a cache")
+        assert read_sample_cache(str(path)) is None
+        assert len(load_sample_columns(str(path), cache=True)) == 3
+
+
+class TestDepthIndex:
+    """Tests for the persistent depth index and depth-range queries."""
+
+    @staticmethod
+    def _rows(depths):
+        return [f"S{i:03d},granite,1.5,{depth},10.0,4.0" for i, depth in enumerate(depths)]
+
+    def test_query_matches_filtered_load(self, sample_file):
+        """Should return the in-range samples in ascending depth order."""
+        rng = random.Random(7)
+        path = sample_file(self._rows([rng.randint(0, 1000) for _ in range(500)]))
+        result = query_samples_by_depth(str(path), 200, 500)
+        expected = sorted((s for s in load_samples_from_file(str(path))
+                           if 200 <= s['depth'] <= 500), key=lambda s: s['depth'])
+        assert result == expected
+        assert Path(depth_index_path(str(path))).exists()
+
+    def test_open_bounds(self, sample_file):
+        """Should treat a missing bound as unbounded."""
+        path = sample_file(self._rows([300, 100, 700, 500]))
+        index = load_depth_index(str(path))
+        assert [s['depth'] for s in index.read(min_depth=500)] == [500, 700]
+        assert [s['depth'] for s in index.read(max_depth=300)] == [100, 300]
+        assert index.count() == 4 and index.count(800, 900) == 0
+
+    def test_changed_file_rebuilds_index(self, sample_file):
+        """Should rebuild the index when the CSV file changes."""
+        path = sample_file(self._rows([100, 200]))
+        assert load_depth_index(str(path)).count(150) == 1
+        sample_file(self._rows([100, 200, 300, 400]))
+        assert [s['depth'] for s in query_samples_by_depth(str(path), 150)] == [200, 300, 400]
+
+    def test_unindexed_and_bad_rows(self, sample_file):
+        """Should skip rows without a numeric depth and report bad matching rows."""
+        path = sample_file(["A1,granite,1.5,n/a,10.0,4.0",
+                            "A2,granite,bad,250,10.0,4.0",
+                            "A3,granite,2.5,260,10.0,4.0"])
+        index = build_depth_index(str(path))
+        assert len(index) == 2
+        with pytest.raises(ValueError, match="line 3"):
+            index.read(200, 300)
+        errors = []
+        assert [s['sample_id'] for s in index.read(200, 300, errors=errors)] == ['A3']
+        assert errors == [SampleError(3, 'grade', "invalid grade value 'bad'")]
+
+    def test_sample_records_and_crlf(self, sample_file):
+        """Should read Sample records from a file with CRLF line endings."""
+        path = sample_file(["A1,granite,1.5,100,10.0,4.0", "A2,basalt,2.5,200,10.0,4.0"],
+                           newline="\r\n")
+        sample, = query_samples_by_depth(str(path), 150, record='sample')
+        assert isinstance(sample, Sample) and sample.rock_type == 'basalt'
+        assert sample.volume == 4.0
+
+
+class TestAssayCompositing:
+    """Tests for downhole interval compositing of assay files."""
+
+    HEADER = ("sample_id", "hole_id", "from_depth", "to_depth", "Au_ppm", "Cu_pct")
+
+    @pytest.fixture
+    def assay_file(self, sample_file):
+        """Write (hole, from, to, Au, Cu) rows to assays.csv with numbered sample IDs."""
+        def write(rows):
+            return sample_file([(f"A{i}",) + tuple(row) for i, row in enumerate(rows)],
+                               "assays.csv", header=self.HEADER)
+        return write
+
+    def test_length_weighted_grades(self, assay_file):
+        """Should weight each interval by its length inside the composite."""
+        path = assay_file([("DH-01", 1, 3, 3.0, 1.0), ("DH-01", 0, 1, 1.0, 1.0)])
+        composites = list(iter_composites(str(path), 2.0))
+        assert [(c['from_depth'], c['to_depth'], c['sampled_length']) for c in composites] \
+            == [(0.0, 2.0, 2.0), (2.0, 4.0, 1.0)]
+        assert composites[0]['Au_ppm'] == pytest.approx(2.0)
+        assert composites[1]['Au_ppm'] == pytest.approx(3.0)
+
+    def test_overlaps_are_split_not_double_counted(self, assay_file):
+        """Should average overlapping intervals over the shared length."""
+        path = assay_file([("DH-01", 0, 2, 2.0, 1.0), ("DH-01", 1, 2, 4.0, 1.0)])
+        composite, = iter_composites(str(path), 2.0)
+        assert composite['Au_ppm'] == pytest.approx(2.5)
+        assert composite['sampled_length'] == pytest.approx(2.0)
+
+    def test_missing_values_left_out(self, assay_file):
+        """Should ignore empty grades per element and report None without data."""
+        path = assay_file([("DH-01", 0, 1, "", 1.0), ("DH-01", 1, 2, 4.0, 3.0),
+                           ("DH-01", 2, 4, "", 2.0)])
+        first, second = iter_composites(str(path), 2.0)
+        assert first['Au_ppm'] == pytest.approx(4.0)
+        assert first['Cu_pct'] == pytest.approx(2.0)
+        assert second['Au_ppm'] is None and second['Cu_pct'] == pytest.approx(2.0)
+
+    def test_interleaved_holes_and_options(self, assay_file):
+        """Should group unsorted holes in order of appearance and honour options."""
+        path = assay_file([("DH-02", 4, 5, 1.0, 1.0), ("DH-01", 0, 5, 2.0, 1.0),
+                           ("DH-02", 0, 1, 3.0, 1.0)])
+        composites = list(iter_composites(str(path), 5.0, grades=['Au_ppm'], origin=1.0))
+        assert [(c['hole_id'], c['from_depth']) for c in composites] \
+            == [('DH-02', -4.0), ('DH-02', 1.0), ('DH-01', -4.0), ('DH-01', 1.0)]
+        assert 'Cu_pct' not in composites[0]
+        kept = list(iter_composites(str(path), 5.0, origin=1.0, min_coverage=0.5))
+        assert [(c['hole_id'], c['from_depth']) for c in kept] == [('DH-01', 1.0)]
+
+    def test_matches_without_numpy_path(self, assay_file, monkeypatch):
+        """Should give the same composites from the pure-Python fallback."""
+        rng = random.Random(11)
+        rows = []
+        for _ in range(300):
+            top = rng.randint(0, 60)
+            rows.append((rng.choice(["DH-01", "DH-02"]), top, top + rng.randint(1, 4),
+                         rng.choice(["", round(rng.uniform(0, 5), 3)]),
+                         round(rng.uniform(0, 3), 3)))
+        path = assay_file(rows)
+        expected = list(iter_composites(str(path), 2.0))
+        monkeypatch.setattr(geology_toolkit, 'np', None)
+        actual = list(iter_composites(str(path), 2.0))
+        assert len(actual) == len(expected)
+        for got, want in zip(actual, expected):
+            for key, value in want.items():
+                assert got[key] == (pytest.approx(value) if isinstance(value, float) else value)
+
+    def test_bad_rows_raise_or_are_collected(self, assay_file):
+        """Should report empty intervals and bad numbers with their line."""
+        path = assay_file([("DH-01", 0, 2, 1.0, 1.0), ("DH-01", 5, 5, 1.0, 1.0),
+                           ("DH-01", 2, 4, "x", 1.0)])
+        with pytest.raises(ValueError, match="line 3"):
+            list(iter_composites(str(path), 2.0))
+        errors = []
+        assert len(list(iter_composites(str(path), 2.0, errors=errors))) == 1
+        assert [(e.line, e.column) for e in errors] == [(3, 'to_depth'), (4, 'Au_ppm')]
+
+    def test_invalid_arguments(self, assay_file):
+        """Should reject a non-positive length and unknown grade columns."""
+        path = assay_file([("DH-01", 0, 2, 1.0, 1.0)])
+        with pytest.raises(ValueError):
+            iter_composites(str(path), 0)
+        with pytest.raises(ValueError):
+            iter_composites(str(path), 2.0, grades=['Zn_pct'])
+
+    def test_composite_assays_writes_csv(self, tmp_path, assay_file):
+        """Should save composites with empty fields for missing grades."""
+        path = assay_file([("DH-01", 0, 2, "", 1.0)])
+        output = tmp_path / "composites.csv"
+        assert composite_assays(str(path), str(output), 2.0) == 1
+        with open(output, newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert list(rows[0]) == ['hole_id', 'from_depth', 'to_depth', 'sampled_length',
+                                 'Au_ppm', 'Cu_pct']
+        assert rows[0]['Au_ppm'] == '' and float(rows[0]['Cu_pct']) == 1.0
+
+
 # =============================================================================
 # INTEGRATION TESTS
 # =============================================================================
@@ -0,0 +1,163 @@
+"""
+Variant Generator Tests
+=======================
+
+These tests verify the batch, bulk-data and command-line modes of
+scripts/variant_generator.py.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add scripts to path for imports
+SCRIPTS_DIR = Path(__file__).parent.parent.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import variant_generator
+
+# Add src to path for imports
+SRC_DIR = Path(__file__).parent.parent.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from geology_toolkit import REQUIRED_COLUMNS, load_samples_from_file
+
+
+def small_generators():
+    """Top-level generator factory, so worker processes can unpickle it."""
+    return {'depth': _depth, 'grade': _grade}
+
+
+def _depth(rng, group_id):
+    return rng.randint(50, 500)
+
+
+def _grade(rng, group_id):
+    return round(rng.uniform(0.3, 5.0), 2)
+
+
+# =============================================================================
+# BATCH GENERATION TESTS
+# =============================================================================
+
+class TestGenerateBatch:
+    """Tests for VariantGenerator.generate_batch."""
+
+    STUDENTS = [f"student{i:02d}" for i in range(11)]
+
+    @pytest.fixture
+    def generator(self):
+        config = variant_generator.VariantConfig(assignment_id="test",
+                                                 variant_strategy="hybrid")
+        return variant_generator.VariantGenerator(config)
+
+    def test_parallel_matches_serial(self, generator):
+        """Should return the same variants in the same order with two workers."""
+        serial = generator.generate_batch(self.STUDENTS, small_generators, workers=1)
+        parallel = generator.generate_batch(self.STUDENTS, small_generators,
+                                            workers=2, chunk_size=3)
+        assert [v.student_id for v in parallel] == self.STUDENTS
+        assert parallel == serial
+
+    def test_factory_and_dict_agree(self, generator):
+        """Should give the same result for a factory and its generator dict."""
+        from_dict = generator.generate_batch(self.STUDENTS, small_generators())
+        from_factory = generator.generate_batch(self.STUDENTS, small_generators)
+        assert from_factory == from_dict
+
+    def test_unpicklable_generators_rejected(self, generator):
+        """Should ask for the factory when the generator dict holds closures."""
+        with pytest.raises(ValueError, match="factory"):
+            generator.generate_batch(self.STUDENTS,
+                                     variant_generator.create_ca01_generators(),
+                                     workers=2)
+
+
+# =============================================================================
+# DATA GENERATION TESTS
+# =============================================================================
+
+class TestGenerateSampleData:
+    """Tests for generate_sample_data."""
+
+    @pytest.fixture
+    def variant(self):
+        config = variant_generator.VariantConfig(assignment_id="lab04",
+                                                 variant_strategy="unique")
+        generator = variant_generator.VariantGenerator(config)
+        return generator.generate_variant("student01",
+                                          variant_generator.create_lab04_generators())
+
+    def _check_samples(self, path, variant, rows):
+        samples = load_samples_from_file(str(path))
+        assert len(samples) == rows
+        assert set(REQUIRED_COLUMNS) <= set(samples[0])
+        depth_range = variant.parameters['depth_range']
+        locations = set(variant.parameters['locations'])
+        for i, sample in enumerate(samples, start=1):
+            assert sample['sample_id'] == f"GEO-{i:03d}"
+            assert sample['rock_type'] in variant_generator.SAMPLE_ROCK_TYPES
+            assert 0.3 <= sample['grade'] <= 5.0
+            assert depth_range['min'] <= sample['depth'] <= depth_range['max']
+            assert 8.0 <= sample['mass'] <= 20.0
+            assert 3.0 <= sample['volume'] <= 8.0
+            assert sample['location'] in locations
+
+    def test_rows_load_as_samples(self, tmp_path, variant):
+        """Should write a samples.csv that load_samples_from_file accepts."""
+        variant_generator.generate_sample_data(variant, tmp_path, 'lab04', num_records=200)
+        self._check_samples(tmp_path / 'samples.csv', variant, 200)
+
+    def test_bulk_rows_load_as_samples(self, tmp_path, variant):
+        """Should write the same schema and value ranges in bulk mode."""
+        pytest.importorskip("numpy")
+        variant_generator.generate_sample_data(variant, tmp_path, 'lab04', num_records=250,
+                                               bulk=True, block_size=100)
+        header = (tmp_path / 'samples.csv').read_text().splitlines()[0]
+        assert header.split(',') == variant_generator.SAMPLE_COLUMNS
+        self._check_samples(tmp_path / 'samples.csv', variant, 250)
+
+    @pytest.mark.parametrize("assignment, filename",
+                             [('lab04', 'samples.csv'), ('ca02', 'geochemical_assays.csv')])
+    def test_bulk_output_independent_of_workers(self, tmp_path, variant, assignment, filename):
+        """Should write byte-identical files with one and three workers."""
+        pytest.importorskip("numpy")
+        contents = []
+        for workers in (1, 3):
+            out = tmp_path / f"workers{workers}"
+            out.mkdir()
+            variant_generator.generate_sample_data(variant, out, assignment, num_records=1000,
+                                                   bulk=True, block_size=64, workers=workers)
+            contents.append((out / filename).read_bytes())
+        assert contents[0] == contents[1]
+        assert contents[0].count(b'\r\n') == 1001
+
+
+# =============================================================================
+# COMMAND-LINE TESTS
+# =============================================================================
+
+class TestCommandLine:
+    """Tests for variant_generator.main."""
+
+    def test_batch_output_json(self, tmp_path, capsys):
+        """Should print one JSON array of variants in batch mode."""
+        students = tmp_path / "students.txt"
+        students.write_text("s1\ns2\n\ns3\n")
+        assert variant_generator.main(['--assignment', 'ca01',
+                                       '--students-file', str(students)]) == 0
+        variants = json.loads(capsys.readouterr().out)
+        assert [v['student_id'] for v in variants] == ['s1', 's2', 's3']
+
+    def test_batch_output_config(self, tmp_path, capsys):
+        """Should print one compact config line per student with --output config."""
+        students = tmp_path / "students.txt"
+        students.write_text("s1\ns2\n")
+        assert variant_generator.main(['--assignment', 'ca01', '--students-file',
+                                       str(students), '--output', 'config']) == 0
+        lines = capsys.readouterr().out.splitlines()
+        configs = [json.loads(line) for line in lines]
+        assert [c['student_id'] for c in configs] == ['s1', 's2']
+        assert all('parameters' in c for c in configs)